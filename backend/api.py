@@ -5,19 +5,73 @@
 # Last Modified: 2025-09-16 12:00:00
 # =====================================================================================
 
+import hashlib
 import json
 import os
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+from datetime import datetime
 from http import HTTPStatus
 
 # Import our modules
-from utils import load_json_data, save_json_data, generate_id, APIError, handle_api_error
+from utils import (generate_id, APIError, handle_api_error, filter_by_category, sort_items,
+                   paginate_items, encode_cursor, decode_cursor, is_valid_id)
+from repository import COLLECTION_NAMES, ORDERINGS, StagedRepository, get_repository, iter_batches
+from router import Router
+from response_cache import get_response_cache
+from http_common import METRICS_PATH
 from models import create_model_instance, get_model_class
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Page size of list endpoints when the client does not ask for one, and the most it may ask for
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+# Ordering of cursor-paged lists when the client does not choose one
+DEFAULT_ORDER = 'created'
+
+# Fields left out of list responses unless requested with ?fields=
+HEAVY_FIELDS = {
+    'courses': (),
+    'lectures': (),
+    'notes': ('content',),
+    'quizzes': ('questions',)
+}
+
+# Collections that can be embedded into a single record with ?include=, by
+# the field holding the record's id in them
+INCLUDES = {
+    'courses': {'lectures': 'course_id', 'notes': 'course_id', 'quizzes': 'course_id'}
+}
+
+# Changes in one /api/sync page when the client does not ask for a limit, and the most it may ask for
+DEFAULT_SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 1000
+
+# Most operations accepted in one /api/batch request
+MAX_BATCH_OPERATIONS = 1000
+
+# Lines of an import staged before they are written, and the most line errors reported
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ERRORS = 100
+
+# Longest NDJSON line accepted by an import
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+
+# Formats of /api/export by their content type, and the records encoded per chunk
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json'
+}
+EXPORT_BATCH_SIZE = 500
+
+# Query parameters understood by GET endpoints; others are ignored
+QUERY_PARAMS = frozenset(('category', 'sort', 'page', 'per_page', 'order', 'after', 'limit',
+                          'fields', 'include', 'course_id', 'lecture_id', 'format', 'updated_since',
+                          'since'))
+
 class APIHandler:
     """Handler for API endpoints"""
     
@@ -27,6 +81,11 @@ class APIHandler:
         # Ensure data directory exists
         os.makedirs(self.data_dir, exist_ok=True)
     
+    @property
+    def repository(self):
+        """Shared in-memory data layer, looked up per call so one handler can serve every request"""
+        return get_repository(self.data_dir)
+    
     def handle_get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """
         Handle GET requests
@@ -39,26 +98,28 @@ class APIHandler:
             API response dictionary
         """
         try:
-            logger.info(f"Handling GET request for {path}")
-            
-            # Remove /api prefix if present
-            if path.startswith('/api'):
-                path = path[4:]  # Remove /api prefix
-            
-            # Route to appropriate handler based on path
-            if path.startswith('/courses'):
-                return self._handle_get_courses(path, params)
-            elif path.startswith('/lectures'):
-                return self._handle_get_lectures(path, params)
-            elif path.startswith('/notes'):
-                return self._handle_get_notes(path, params)
-            elif path.startswith('/quizzes'):
-                return self._handle_get_quizzes(path, params)
-            else:
+            logger.debug("Handling GET request for %s", path)
+            route, path_params, error = self._route('GET', path)
+            if error:
+                return error
+            collection_name, handler = route
+            record_id = next(iter(path_params.values()), None)
+            # Unknown parameters would only split the response cache
+            params = {name: value for name, value in params.items() if name in QUERY_PARAMS}
+            if collection_name is None:
+                # Routes outside the collections are neither versioned nor cached
+                return handler(self, params, **path_params)
+            fields = self._names_param(params, 'fields')
+            includes = self._names_param(params, 'include')
+            unknown = [name for name in includes if not record_id or name not in INCLUDES.get(collection_name, {})]
+            if unknown:
                 return {
-                    'status': HTTPStatus.NOT_FOUND,
-                    'error': 'Endpoint not found'
+                    'status': HTTPStatus.BAD_REQUEST,
+                    'error': f"Cannot include {', '.join(unknown)}"
                 }
+            return self._versioned((collection_name,) + includes, path, params, record_id,
+                                   lambda: self._project(collection_name, fields, includes, record_id is None,
+                                                         handler(self, params, **path_params)))
         except Exception as e:
             logger.error(f"Error handling GET request for {path}: {e}", exc_info=True)
             return handle_api_error(e)
@@ -75,26 +136,12 @@ class APIHandler:
             API response dictionary
         """
         try:
-            logger.info(f"Handling POST request for {path}")
-            
-            # Remove /api prefix if present
-            if path.startswith('/api'):
-                path = path[4:]  # Remove /api prefix
-            
-            # Route to appropriate handler based on path
-            if path.startswith('/courses'):
-                return self._handle_create_course(data)
-            elif path.startswith('/lectures'):
-                return self._handle_create_lecture(data)
-            elif path.startswith('/notes'):
-                return self._handle_create_note(data)
-            elif path.startswith('/quizzes'):
-                return self._handle_create_quiz(data)
-            else:
-                return {
-                    'status': HTTPStatus.NOT_FOUND,
-                    'error': 'Endpoint not found'
-                }
+            logger.debug("Handling POST request for %s", path)
+            route, path_params, error = self._route('POST', path)
+            if error:
+                return error
+            collection_name, handler = route
+            return self._invalidating(collection_name, handler(self, data, **path_params))
         except Exception as e:
             logger.error(f"Error handling POST request for {path}: {e}", exc_info=True)
             return handle_api_error(e)
@@ -111,26 +158,12 @@ class APIHandler:
             API response dictionary
         """
         try:
-            logger.info(f"Handling PUT request for {path}")
-            
-            # Remove /api prefix if present
-            if path.startswith('/api'):
-                path = path[4:]  # Remove /api prefix
-            
-            # Route to appropriate handler based on path
-            if path.startswith('/courses/'):
-                return self._handle_update_course(path, data)
-            elif path.startswith('/lectures/'):
-                return self._handle_update_lecture(path, data)
-            elif path.startswith('/notes/'):
-                return self._handle_update_note(path, data)
-            elif path.startswith('/quizzes/'):
-                return self._handle_update_quiz(path, data)
-            else:
-                return {
-                    'status': HTTPStatus.NOT_FOUND,
-                    'error': 'Endpoint not found'
-                }
+            logger.debug("Handling PUT request for %s", path)
+            route, path_params, error = self._route('PUT', path)
+            if error:
+                return error
+            collection_name, handler = route
+            return self._invalidating(collection_name, handler(self, data=data, **path_params))
         except Exception as e:
             logger.error(f"Error handling PUT request for {path}: {e}", exc_info=True)
             return handle_api_error(e)
@@ -146,60 +179,63 @@ class APIHandler:
             API response dictionary
         """
         try:
-            logger.info(f"Handling DELETE request for {path}")
-            
-            # Remove /api prefix if present
-            if path.startswith('/api'):
-                path = path[4:]  # Remove /api prefix
-            
-            # Route to appropriate handler based on path
-            if path.startswith('/courses/'):
-                return self._handle_delete_course(path)
-            elif path.startswith('/lectures/'):
-                return self._handle_delete_lecture(path)
-            elif path.startswith('/notes/'):
-                return self._handle_delete_note(path)
-            elif path.startswith('/quizzes/'):
-                return self._handle_delete_quiz(path)
-            else:
-                return {
-                    'status': HTTPStatus.NOT_FOUND,
-                    'error': 'Endpoint not found'
-                }
+            logger.debug("Handling DELETE request for %s", path)
+            route, path_params, error = self._route('DELETE', path)
+            if error:
+                return error
+            collection_name, handler = route
+            return self._invalidating(collection_name, handler(self, **path_params))
         except Exception as e:
             logger.error(f"Error handling DELETE request for {path}: {e}", exc_info=True)
             return handle_api_error(e)
     
+    def _route(self, method: str, path: str) -> Tuple[Any, Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Look up the route for a request
+        
+        Returns:
+            (route target, path parameters, error response or None)
+        """
+        # Remove /api prefix if present
+        if path.startswith('/api/') or path == '/api':
+            path = path[4:]
+        
+        route, path_params, allowed = ROUTER.match(method, path)
+        if route is not None:
+            return route, path_params, None
+        if allowed:
+            return None, {}, {
+                'status': HTTPStatus.METHOD_NOT_ALLOWED,
+                'error': f"Method not allowed, use {', '.join(allowed)}"
+            }
+        return None, {}, {
+            'status': HTTPStatus.NOT_FOUND,
+            'error': 'Endpoint not found'
+        }
+    
     # === Course handlers ===
     
-    def _handle_get_courses(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_get_courses(self, params: Dict[str, Any], course_id: Optional[str] = None) -> Dict[str, Any]:
         """Handle GET requests for courses"""
         try:
-            # Get all courses
-            courses_file = os.path.join(self.data_dir, 'courses.json')
-            courses = load_json_data(courses_file)
+            courses = self.repository.collection('courses')
             
             # If requesting a specific course
-            if path.startswith('/courses/'):
-                course_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-                if course_id:
-                    course = next((c for c in courses if c['id'] == course_id), None)
-                    if course:
-                        return {
-                            'status': HTTPStatus.OK,
-                            'data': course
-                        }
-                    else:
-                        return {
-                            'status': HTTPStatus.NOT_FOUND,
-                            'error': 'Course not found'
-                        }
-            
-            # Return all courses
-            return {
-                'status': HTTPStatus.OK,
-                'data': courses
-            }
+            if course_id:
+                course = courses.get(course_id)
+                if course:
+                    return {
+                        'status': HTTPStatus.OK,
+                        'data': self._with_includes('courses', course, params)
+                    }
+                else:
+                    return {
+                        'status': HTTPStatus.NOT_FOUND,
+                        'error': 'Course not found'
+                    }
+            
+            # Return a page of courses
+            return self._list_response(courses, {}, params)
         except Exception as e:
             logger.error(f"Error getting courses: {e}", exc_info=True)
             return handle_api_error(e)
@@ -217,8 +253,9 @@ class APIHandler:
                     }
             
             # Create course object
+            now = self._get_current_timestamp()
             course_data = {
-                'id': generate_id(),
+                'id': self._new_id('courses', data),
                 'title': data['title'],
                 'description': data['description'],
                 'category': data['category'],
@@ -226,18 +263,13 @@ class APIHandler:
                 'lectures_count': data.get('lectures_count', 0),
                 'instructor': data.get('instructor', ''),
                 'thumbnail': data.get('thumbnail', ''),
-                'level': data.get('level', 'Beginner')
+                'level': data.get('level', 'Beginner'),
+                'created_at': now,
+                'updated_at': now
             }
             
-            # Load existing courses
-            courses_file = os.path.join(self.data_dir, 'courses.json')
-            courses = load_json_data(courses_file)
-            
             # Add new course
-            courses.append(course_data)
-            
-            # Save courses
-            if save_json_data(courses_file, courses):
+            if self.repository.collection('courses').insert(course_data):
                 return {
                     'status': HTTPStatus.CREATED,
                     'data': course_data
@@ -251,49 +283,29 @@ class APIHandler:
             logger.error(f"Error creating course: {e}", exc_info=True)
             return handle_api_error(e)
     
-    def _handle_update_course(self, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_update_course(self, course_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle PUT requests to update a course"""
         try:
-            # Extract course ID from path
-            course_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-            if not course_id:
-                return {
-                    'status': HTTPStatus.BAD_REQUEST,
-                    'error': 'Course ID is required'
-                }
-            
-            # Load existing courses
-            courses_file = os.path.join(self.data_dir, 'courses.json')
-            courses = load_json_data(courses_file)
-            
             # Find course to update
-            course_index = None
-            for i, course in enumerate(courses):
-                if course['id'] == course_id:
-                    course_index = i
-                    break
-            
-            if course_index is None:
+            courses = self.repository.collection('courses')
+            if courses.get(course_id) is None:
                 return {
                     'status': HTTPStatus.NOT_FOUND,
                     'error': 'Course not found'
                 }
             
-            # Update course fields
-            course = courses[course_index]
+            # Collect updated course fields
             updatable_fields = ['title', 'description', 'category', 'duration', 'lectures_count', 'instructor', 'thumbnail', 'level']
-            for field in updatable_fields:
-                if field in data:
-                    course[field] = data[field]
+            changes = {field: data[field] for field in updatable_fields if field in data}
             
             # Update timestamp
-            course['updated_at'] = self._get_current_timestamp()
+            changes['updated_at'] = self._get_current_timestamp()
             
-            # Save courses
-            if save_json_data(courses_file, courses):
+            # Save course
+            if courses.update(course_id, changes):
                 return {
                     'status': HTTPStatus.OK,
-                    'data': course
+                    'data': courses.get(course_id)
                 }
             else:
                 return {
@@ -304,39 +316,20 @@ class APIHandler:
             logger.error(f"Error updating course: {e}", exc_info=True)
             return handle_api_error(e)
     
-    def _handle_delete_course(self, path: str) -> Dict[str, Any]:
+    def _handle_delete_course(self, course_id: str) -> Dict[str, Any]:
         """Handle DELETE requests to delete a course"""
         try:
-            # Extract course ID from path
-            course_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-            if not course_id:
-                return {
-                    'status': HTTPStatus.BAD_REQUEST,
-                    'error': 'Course ID is required'
-                }
-            
-            # Load existing courses
-            courses_file = os.path.join(self.data_dir, 'courses.json')
-            courses = load_json_data(courses_file)
-            
             # Find course to delete
-            course_index = None
-            for i, course in enumerate(courses):
-                if course['id'] == course_id:
-                    course_index = i
-                    break
-            
-            if course_index is None:
+            courses = self.repository.collection('courses')
+            deleted_course = courses.get(course_id)
+            if deleted_course is None:
                 return {
                     'status': HTTPStatus.NOT_FOUND,
                     'error': 'Course not found'
                 }
             
             # Remove course
-            deleted_course = courses.pop(course_index)
-            
-            # Save courses
-            if save_json_data(courses_file, courses):
+            if courses.delete(course_id):
                 return {
                     'status': HTTPStatus.OK,
                     'data': deleted_course
@@ -352,39 +345,27 @@ class APIHandler:
     
     # === Lecture handlers ===
     
-    def _handle_get_lectures(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_get_lectures(self, params: Dict[str, Any], lecture_id: Optional[str] = None) -> Dict[str, Any]:
         """Handle GET requests for lectures"""
         try:
-            # Get all lectures
-            lectures_file = os.path.join(self.data_dir, 'lectures.json')
-            lectures = load_json_data(lectures_file)
-            
-            # Filter by course_id if provided
-            course_id = params.get('course_id')
-            if course_id:
-                lectures = [l for l in lectures if l.get('course_id') == course_id]
+            collection = self.repository.collection('lectures')
             
             # If requesting a specific lecture
-            if path.startswith('/lectures/'):
-                lecture_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-                if lecture_id:
-                    lecture = next((l for l in lectures if l['id'] == lecture_id), None)
-                    if lecture:
-                        return {
-                            'status': HTTPStatus.OK,
-                            'data': lecture
-                        }
-                    else:
-                        return {
-                            'status': HTTPStatus.NOT_FOUND,
-                            'error': 'Lecture not found'
-                        }
-            
-            # Return lectures
-            return {
-                'status': HTTPStatus.OK,
-                'data': lectures
-            }
+            if lecture_id:
+                lecture = collection.get(lecture_id)
+                if lecture and self._matches_filters(lecture, params, ('course_id',)):
+                    return {
+                        'status': HTTPStatus.OK,
+                        'data': lecture
+                    }
+                else:
+                    return {
+                        'status': HTTPStatus.NOT_FOUND,
+                        'error': 'Lecture not found'
+                    }
+            
+            # Return a page of lectures, filtered by course_id if provided
+            return self._list_response(collection, {'course_id': params.get('course_id')}, params)
         except Exception as e:
             logger.error(f"Error getting lectures: {e}", exc_info=True)
             return handle_api_error(e)
@@ -402,25 +383,21 @@ class APIHandler:
                     }
             
             # Create lecture object
+            now = self._get_current_timestamp()
             lecture_data = {
-                'id': generate_id(),
+                'id': self._new_id('lectures', data),
                 'course_id': data['course_id'],
                 'title': data['title'],
                 'description': data['description'],
                 'duration': data.get('duration', 0),
                 'video_url': data['video_url'],
-                'order': data.get('order', 0)
+                'order': data.get('order', 0),
+                'created_at': now,
+                'updated_at': now
             }
             
-            # Load existing lectures
-            lectures_file = os.path.join(self.data_dir, 'lectures.json')
-            lectures = load_json_data(lectures_file)
-            
             # Add new lecture
-            lectures.append(lecture_data)
-            
-            # Save lectures
-            if save_json_data(lectures_file, lectures):
+            if self.repository.collection('lectures').insert(lecture_data):
                 return {
                     'status': HTTPStatus.CREATED,
                     'data': lecture_data
@@ -434,49 +411,29 @@ class APIHandler:
             logger.error(f"Error creating lecture: {e}", exc_info=True)
             return handle_api_error(e)
     
-    def _handle_update_lecture(self, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_update_lecture(self, lecture_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle PUT requests to update a lecture"""
         try:
-            # Extract lecture ID from path
-            lecture_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-            if not lecture_id:
-                return {
-                    'status': HTTPStatus.BAD_REQUEST,
-                    'error': 'Lecture ID is required'
-                }
-            
-            # Load existing lectures
-            lectures_file = os.path.join(self.data_dir, 'lectures.json')
-            lectures = load_json_data(lectures_file)
-            
             # Find lecture to update
-            lecture_index = None
-            for i, lecture in enumerate(lectures):
-                if lecture['id'] == lecture_id:
-                    lecture_index = i
-                    break
-            
-            if lecture_index is None:
+            lectures = self.repository.collection('lectures')
+            if lectures.get(lecture_id) is None:
                 return {
                     'status': HTTPStatus.NOT_FOUND,
                     'error': 'Lecture not found'
                 }
             
-            # Update lecture fields
-            lecture = lectures[lecture_index]
+            # Collect updated lecture fields
             updatable_fields = ['course_id', 'title', 'description', 'duration', 'video_url', 'order']
-            for field in updatable_fields:
-                if field in data:
-                    lecture[field] = data[field]
+            changes = {field: data[field] for field in updatable_fields if field in data}
             
             # Update timestamp
-            lecture['updated_at'] = self._get_current_timestamp()
+            changes['updated_at'] = self._get_current_timestamp()
             
-            # Save lectures
-            if save_json_data(lectures_file, lectures):
+            # Save lecture
+            if lectures.update(lecture_id, changes):
                 return {
                     'status': HTTPStatus.OK,
-                    'data': lecture
+                    'data': lectures.get(lecture_id)
                 }
             else:
                 return {
@@ -487,39 +444,20 @@ class APIHandler:
             logger.error(f"Error updating lecture: {e}", exc_info=True)
             return handle_api_error(e)
     
-    def _handle_delete_lecture(self, path: str) -> Dict[str, Any]:
+    def _handle_delete_lecture(self, lecture_id: str) -> Dict[str, Any]:
         """Handle DELETE requests to delete a lecture"""
         try:
-            # Extract lecture ID from path
-            lecture_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-            if not lecture_id:
-                return {
-                    'status': HTTPStatus.BAD_REQUEST,
-                    'error': 'Lecture ID is required'
-                }
-            
-            # Load existing lectures
-            lectures_file = os.path.join(self.data_dir, 'lectures.json')
-            lectures = load_json_data(lectures_file)
-            
             # Find lecture to delete
-            lecture_index = None
-            for i, lecture in enumerate(lectures):
-                if lecture['id'] == lecture_id:
-                    lecture_index = i
-                    break
-            
-            if lecture_index is None:
+            lectures = self.repository.collection('lectures')
+            deleted_lecture = lectures.get(lecture_id)
+            if deleted_lecture is None:
                 return {
                     'status': HTTPStatus.NOT_FOUND,
                     'error': 'Lecture not found'
                 }
             
             # Remove lecture
-            deleted_lecture = lectures.pop(lecture_index)
-            
-            # Save lectures
-            if save_json_data(lectures_file, lectures):
+            if lectures.delete(lecture_id):
                 return {
                     'status': HTTPStatus.OK,
                     'data': deleted_lecture
@@ -535,43 +473,30 @@ class APIHandler:
     
     # === Note handlers ===
     
-    def _handle_get_notes(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_get_notes(self, params: Dict[str, Any], note_id: Optional[str] = None) -> Dict[str, Any]:
         """Handle GET requests for notes"""
         try:
-            # Get all notes
-            notes_file = os.path.join(self.data_dir, 'notes.json')
-            notes = load_json_data(notes_file)
-            
-            # Filter by course_id or lecture_id if provided
-            course_id = params.get('course_id')
-            lecture_id = params.get('lecture_id')
-            
-            if course_id:
-                notes = [n for n in notes if n.get('course_id') == course_id]
-            if lecture_id:
-                notes = [n for n in notes if n.get('lecture_id') == lecture_id]
+            collection = self.repository.collection('notes')
             
             # If requesting a specific note
-            if path.startswith('/notes/'):
-                note_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-                if note_id:
-                    note = next((n for n in notes if n['id'] == note_id), None)
-                    if note:
-                        return {
-                            'status': HTTPStatus.OK,
-                            'data': note
-                        }
-                    else:
-                        return {
-                            'status': HTTPStatus.NOT_FOUND,
-                            'error': 'Note not found'
-                        }
-            
-            # Return notes
-            return {
-                'status': HTTPStatus.OK,
-                'data': notes
-            }
+            if note_id:
+                note = collection.get(note_id)
+                if note and self._matches_filters(note, params, ('course_id', 'lecture_id')):
+                    return {
+                        'status': HTTPStatus.OK,
+                        'data': note
+                    }
+                else:
+                    return {
+                        'status': HTTPStatus.NOT_FOUND,
+                        'error': 'Note not found'
+                    }
+            
+            # Return a page of notes, filtered by course_id or lecture_id if provided
+            return self._list_response(collection, {
+                'course_id': params.get('course_id'),
+                'lecture_id': params.get('lecture_id')
+            }, params)
         except Exception as e:
             logger.error(f"Error getting notes: {e}", exc_info=True)
             return handle_api_error(e)
@@ -589,24 +514,20 @@ class APIHandler:
                     }
             
             # Create note object
+            now = self._get_current_timestamp()
             note_data = {
-                'id': generate_id(),
+                'id': self._new_id('notes', data),
                 'course_id': data['course_id'],
                 'lecture_id': data['lecture_id'],
                 'title': data['title'],
                 'content': data['content'],
-                'file_url': data.get('file_url', '')
+                'file_url': data.get('file_url', ''),
+                'created_at': now,
+                'updated_at': now
             }
             
-            # Load existing notes
-            notes_file = os.path.join(self.data_dir, 'notes.json')
-            notes = load_json_data(notes_file)
-            
             # Add new note
-            notes.append(note_data)
-            
-            # Save notes
-            if save_json_data(notes_file, notes):
+            if self.repository.collection('notes').insert(note_data):
                 return {
                     'status': HTTPStatus.CREATED,
                     'data': note_data
@@ -620,49 +541,29 @@ class APIHandler:
             logger.error(f"Error creating note: {e}", exc_info=True)
             return handle_api_error(e)
     
-    def _handle_update_note(self, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_update_note(self, note_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle PUT requests to update a note"""
         try:
-            # Extract note ID from path
-            note_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-            if not note_id:
-                return {
-                    'status': HTTPStatus.BAD_REQUEST,
-                    'error': 'Note ID is required'
-                }
-            
-            # Load existing notes
-            notes_file = os.path.join(self.data_dir, 'notes.json')
-            notes = load_json_data(notes_file)
-            
             # Find note to update
-            note_index = None
-            for i, note in enumerate(notes):
-                if note['id'] == note_id:
-                    note_index = i
-                    break
-            
-            if note_index is None:
+            notes = self.repository.collection('notes')
+            if notes.get(note_id) is None:
                 return {
                     'status': HTTPStatus.NOT_FOUND,
                     'error': 'Note not found'
                 }
             
-            # Update note fields
-            note = notes[note_index]
+            # Collect updated note fields
             updatable_fields = ['course_id', 'lecture_id', 'title', 'content', 'file_url']
-            for field in updatable_fields:
-                if field in data:
-                    note[field] = data[field]
+            changes = {field: data[field] for field in updatable_fields if field in data}
             
             # Update timestamp
-            note['updated_at'] = self._get_current_timestamp()
+            changes['updated_at'] = self._get_current_timestamp()
             
-            # Save notes
-            if save_json_data(notes_file, notes):
+            # Save note
+            if notes.update(note_id, changes):
                 return {
                     'status': HTTPStatus.OK,
-                    'data': note
+                    'data': notes.get(note_id)
                 }
             else:
                 return {
@@ -673,39 +574,20 @@ class APIHandler:
             logger.error(f"Error updating note: {e}", exc_info=True)
             return handle_api_error(e)
     
-    def _handle_delete_note(self, path: str) -> Dict[str, Any]:
+    def _handle_delete_note(self, note_id: str) -> Dict[str, Any]:
         """Handle DELETE requests to delete a note"""
         try:
-            # Extract note ID from path
-            note_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-            if not note_id:
-                return {
-                    'status': HTTPStatus.BAD_REQUEST,
-                    'error': 'Note ID is required'
-                }
-            
-            # Load existing notes
-            notes_file = os.path.join(self.data_dir, 'notes.json')
-            notes = load_json_data(notes_file)
-            
             # Find note to delete
-            note_index = None
-            for i, note in enumerate(notes):
-                if note['id'] == note_id:
-                    note_index = i
-                    break
-            
-            if note_index is None:
+            notes = self.repository.collection('notes')
+            deleted_note = notes.get(note_id)
+            if deleted_note is None:
                 return {
                     'status': HTTPStatus.NOT_FOUND,
                     'error': 'Note not found'
                 }
             
             # Remove note
-            deleted_note = notes.pop(note_index)
-            
-            # Save notes
-            if save_json_data(notes_file, notes):
+            if notes.delete(note_id):
                 return {
                     'status': HTTPStatus.OK,
                     'data': deleted_note
@@ -721,43 +603,30 @@ class APIHandler:
     
     # === Quiz handlers ===
     
-    def _handle_get_quizzes(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_get_quizzes(self, params: Dict[str, Any], quiz_id: Optional[str] = None) -> Dict[str, Any]:
         """Handle GET requests for quizzes"""
         try:
-            # Get all quizzes
-            quizzes_file = os.path.join(self.data_dir, 'quizzes.json')
-            quizzes = load_json_data(quizzes_file)
-            
-            # Filter by course_id or lecture_id if provided
-            course_id = params.get('course_id')
-            lecture_id = params.get('lecture_id')
-            
-            if course_id:
-                quizzes = [q for q in quizzes if q.get('course_id') == course_id]
-            if lecture_id:
-                quizzes = [q for q in quizzes if q.get('lecture_id') == lecture_id]
+            collection = self.repository.collection('quizzes')
             
             # If requesting a specific quiz
-            if path.startswith('/quizzes/'):
-                quiz_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-                if quiz_id:
-                    quiz = next((q for q in quizzes if q['id'] == quiz_id), None)
-                    if quiz:
-                        return {
-                            'status': HTTPStatus.OK,
-                            'data': quiz
-                        }
-                    else:
-                        return {
-                            'status': HTTPStatus.NOT_FOUND,
-                            'error': 'Quiz not found'
-                        }
-            
-            # Return quizzes
-            return {
-                'status': HTTPStatus.OK,
-                'data': quizzes
-            }
+            if quiz_id:
+                quiz = collection.get(quiz_id)
+                if quiz and self._matches_filters(quiz, params, ('course_id', 'lecture_id')):
+                    return {
+                        'status': HTTPStatus.OK,
+                        'data': quiz
+                    }
+                else:
+                    return {
+                        'status': HTTPStatus.NOT_FOUND,
+                        'error': 'Quiz not found'
+                    }
+            
+            # Return a page of quizzes, filtered by course_id or lecture_id if provided
+            return self._list_response(collection, {
+                'course_id': params.get('course_id'),
+                'lecture_id': params.get('lecture_id')
+            }, params)
         except Exception as e:
             logger.error(f"Error getting quizzes: {e}", exc_info=True)
             return handle_api_error(e)
@@ -775,23 +644,19 @@ class APIHandler:
                     }
             
             # Create quiz object
+            now = self._get_current_timestamp()
             quiz_data = {
-                'id': generate_id(),
+                'id': self._new_id('quizzes', data),
                 'course_id': data['course_id'],
                 'lecture_id': data['lecture_id'],
                 'title': data['title'],
-                'questions': data.get('questions', [])
+                'questions': data.get('questions', []),
+                'created_at': now,
+                'updated_at': now
             }
             
-            # Load existing quizzes
-            quizzes_file = os.path.join(self.data_dir, 'quizzes.json')
-            quizzes = load_json_data(quizzes_file)
-            
             # Add new quiz
-            quizzes.append(quiz_data)
-            
-            # Save quizzes
-            if save_json_data(quizzes_file, quizzes):
+            if self.repository.collection('quizzes').insert(quiz_data):
                 return {
                     'status': HTTPStatus.CREATED,
                     'data': quiz_data
@@ -805,49 +670,29 @@ class APIHandler:
             logger.error(f"Error creating quiz: {e}", exc_info=True)
             return handle_api_error(e)
     
-    def _handle_update_quiz(self, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def _handle_update_quiz(self, quiz_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle PUT requests to update a quiz"""
         try:
-            # Extract quiz ID from path
-            quiz_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-            if not quiz_id:
-                return {
-                    'status': HTTPStatus.BAD_REQUEST,
-                    'error': 'Quiz ID is required'
-                }
-            
-            # Load existing quizzes
-            quizzes_file = os.path.join(self.data_dir, 'quizzes.json')
-            quizzes = load_json_data(quizzes_file)
-            
             # Find quiz to update
-            quiz_index = None
-            for i, quiz in enumerate(quizzes):
-                if quiz['id'] == quiz_id:
-                    quiz_index = i
-                    break
-            
-            if quiz_index is None:
+            quizzes = self.repository.collection('quizzes')
+            if quizzes.get(quiz_id) is None:
                 return {
                     'status': HTTPStatus.NOT_FOUND,
                     'error': 'Quiz not found'
                 }
             
-            # Update quiz fields
-            quiz = quizzes[quiz_index]
+            # Collect updated quiz fields
             updatable_fields = ['course_id', 'lecture_id', 'title', 'questions']
-            for field in updatable_fields:
-                if field in data:
-                    quiz[field] = data[field]
+            changes = {field: data[field] for field in updatable_fields if field in data}
             
             # Update timestamp
-            quiz['updated_at'] = self._get_current_timestamp()
+            changes['updated_at'] = self._get_current_timestamp()
             
-            # Save quizzes
-            if save_json_data(quizzes_file, quizzes):
+            # Save quiz
+            if quizzes.update(quiz_id, changes):
                 return {
                     'status': HTTPStatus.OK,
-                    'data': quiz
+                    'data': quizzes.get(quiz_id)
                 }
             else:
                 return {
@@ -858,39 +703,20 @@ class APIHandler:
             logger.error(f"Error updating quiz: {e}", exc_info=True)
             return handle_api_error(e)
     
-    def _handle_delete_quiz(self, path: str) -> Dict[str, Any]:
+    def _handle_delete_quiz(self, quiz_id: str) -> Dict[str, Any]:
         """Handle DELETE requests to delete a quiz"""
         try:
-            # Extract quiz ID from path
-            quiz_id = path.split('/')[2] if len(path.split('/')) > 2 else None
-            if not quiz_id:
-                return {
-                    'status': HTTPStatus.BAD_REQUEST,
-                    'error': 'Quiz ID is required'
-                }
-            
-            # Load existing quizzes
-            quizzes_file = os.path.join(self.data_dir, 'quizzes.json')
-            quizzes = load_json_data(quizzes_file)
-            
             # Find quiz to delete
-            quiz_index = None
-            for i, quiz in enumerate(quizzes):
-                if quiz['id'] == quiz_id:
-                    quiz_index = i
-                    break
-            
-            if quiz_index is None:
+            quizzes = self.repository.collection('quizzes')
+            deleted_quiz = quizzes.get(quiz_id)
+            if deleted_quiz is None:
                 return {
                     'status': HTTPStatus.NOT_FOUND,
                     'error': 'Quiz not found'
                 }
             
             # Remove quiz
-            deleted_quiz = quizzes.pop(quiz_index)
-            
-            # Save quizzes
-            if save_json_data(quizzes_file, quizzes):
+            if quizzes.delete(quiz_id):
                 return {
                     'status': HTTPStatus.OK,
                     'data': deleted_quiz
@@ -904,7 +730,751 @@ class APIHandler:
             logger.error(f"Error deleting quiz: {e}", exc_info=True)
             return handle_api_error(e)
     
+    # === Export handler ===
+    
+    def _handle_export(self, params: Dict[str, Any], collection: str) -> Dict[str, Any]:
+        """
+        Handle GET requests streaming a whole collection
+        
+        Records are read from the data layer a batch at a time and encoded as
+        they are sent, so memory use stays flat however large the collection
+        is. The body is sent with chunked transfer coding.
+        
+        Args:
+            params: Query parameters; format (ndjson or json), course_id,
+                lecture_id, category and updated_since are used
+            collection: Name of the exported collection
+            
+        Returns:
+            API response whose 'stream' yields the encoded body in pieces
+            
+        Raises:
+            APIError: If format or updated_since is invalid
+        """
+        if collection not in COLLECTION_NAMES:
+            return {
+                'status': HTTPStatus.NOT_FOUND,
+                'error': f"Collection not found: {collection}"
+            }
+        export_format = params.get('format') or 'ndjson'
+        if export_format not in EXPORT_FORMATS:
+            raise APIError(f"Invalid format: use {', '.join(EXPORT_FORMATS)}", HTTPStatus.BAD_REQUEST)
+        
+        updated_since = params.get('updated_since')
+        if updated_since:
+            # Normalised so it compares with stored timestamps as a string
+            try:
+                updated_since = datetime.fromisoformat(updated_since).isoformat()
+            except ValueError:
+                raise APIError('Invalid updated_since: use an ISO 8601 timestamp', HTTPStatus.BAD_REQUEST)
+        
+        filters = {name: params.get(name) for name in ('course_id', 'lecture_id', 'category')}
+        if filters['category'] == 'all':
+            filters['category'] = None
+        return {
+            'status': HTTPStatus.OK,
+            'content_type': EXPORT_FORMATS[export_format],
+            'stream': self._export_chunks(collection, filters, updated_since, export_format == 'json')
+        }
+    
+    def _export_chunks(self, collection_name: str, filters: Dict[str, Any], updated_since: Optional[str],
+                       as_array: bool) -> Iterator[bytes]:
+        """Encode the records of an export, one chunk per batch read from the data layer"""
+        exported = 0
+        separator = b'['
+        for records in iter_batches(self.repository.collection(collection_name), filters, EXPORT_BATCH_SIZE):
+            lines = [
+                json.dumps(record).encode('utf-8') for record in records
+                if not updated_since or (record.get('updated_at') or record.get('created_at') or '') >= updated_since
+            ]
+            if not lines:
+                continue
+            exported += len(lines)
+            if as_array:
+                yield separator + b',\n'.join(lines)
+                separator = b',\n'
+            else:
+                yield b'\n'.join(lines) + b'\n'
+        if as_array:
+            yield b']' if exported else b'[]'
+        logger.info(f"Exported {exported} {collection_name}")
+    
+    # === Sync handler ===
+    
+    def _handle_sync(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Handle GET requests for the changes made since a client last synced
+        
+        Changes to every collection are numbered from one sequence, and
+        deletes leave tombstones. A sync returns the records put and deleted
+        after ?since=<number>, up to the latest change when the sync started,
+        so its cost follows the number of changes rather than the data size.
+        Without since, every record is returned. The changes come in pages
+        ordered by (change_seq, collection, id): pass 'next' as ?after=
+        until it is None, then keep 'sequence' as the next since. Tombstones
+        are pruned after a while, so a since or cursor older than the
+        repository's sync horizon gets 410 Gone: the client must sync again
+        without since.
+        
+        Args:
+            params: Query parameters; since, after and limit are used
+            
+        Returns:
+            API response whose data holds the changes, the sequence number
+            the sync reaches and the cursor of the next page, or 410 Gone
+            
+        Raises:
+            APIError: If since, after or limit is invalid
+        """
+        limit = min(self._positive_int_param(params, 'limit', DEFAULT_SYNC_LIMIT), MAX_SYNC_LIMIT)
+        if params.get('after'):
+            try:
+                until, since, change_seq, cursor_collection, record_id = decode_cursor(params['after'])
+            except ValueError:
+                raise APIError('Invalid cursor', HTTPStatus.BAD_REQUEST)
+            if not (isinstance(until, int) and isinstance(since, int) and isinstance(change_seq, int)
+                    and cursor_collection in COLLECTION_NAMES and isinstance(record_id, str)):
+                raise APIError('Invalid cursor', HTTPStatus.BAD_REQUEST)
+            # Changes before the cursor's were already sent
+            reached = change_seq - 1
+            # Ids are never empty: (n, '') is the position before every change numbered n
+            positions = {
+                name: (change_seq + 1, '') if name < cursor_collection
+                else (change_seq, record_id) if name == cursor_collection
+                else (change_seq, '')
+                for name in COLLECTION_NAMES
+            }
+        else:
+            since = params.get('since') or ''
+            if since and not since.isdecimal():
+                raise APIError('Invalid since: must be a change sequence number', HTTPStatus.BAD_REQUEST)
+            since = int(since) if since else -1
+            # Read before the collections, so every change up to it is seen
+            until = self.repository.last_change()
+            positions = {name: (since + 1, '') for name in COLLECTION_NAMES}
+            reached = since
+        # A full sync needs no tombstones, others every one after the changes already sent
+        if since >= 0 and reached < self.repository.sync_horizon():
+            return {
+                'status': HTTPStatus.GONE,
+                'error': 'Full resync required: deletes this old are no longer kept, sync again without since'
+            }
+
+        # One record beyond the page from each collection tells whether another page follows
+        found = []
+        for name in COLLECTION_NAMES:
+            for record in self.repository.collection(name).changes(positions[name], until, limit + 1):
+                found.append((record.get('change_seq') or 0, name, record.get('id') or '', record))
+        found.sort(key=lambda change: change[:3])
+        more = len(found) > limit
+        found = found[:limit]
+        
+        changes = []
+        for change_seq, name, record_id, record in found:
+            change = {'change_seq': change_seq, 'collection': name, 'id': record_id}
+            if record.get('deleted') is True:
+                change['op'] = 'delete'
+            else:
+                change['op'] = 'put'
+                change['record'] = record
+            changes.append(change)
+        return {
+            'status': HTTPStatus.OK,
+            'data': {
+                'changes': changes,
+                'sequence': until,
+                'next': encode_cursor([until, since, *found[-1][:3]]) if more else None
+            }
+        }
+    
+    # === Batch handler ===
+    
+    def _handle_batch(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Handle POST requests running several write operations at once
+        
+        Each operation is {"method": "POST" | "PUT" | "DELETE", "path": "/api/...",
+        "body": {...}} and is validated by the same handler as a single
+        request. The writes are staged and then committed with one write
+        per touched collection. With "atomic": true nothing is written
+        unless every operation succeeds; if a collection fails to save, the
+        collections saved before it are restored and the batch fails.
+        
+        Args:
+            data: {"operations": [...], "atomic": bool}
+            
+        Returns:
+            API response whose data holds one {status, data | error} result per operation
+        """
+        try:
+            if not isinstance(data, dict):
+                return {
+                    'status': HTTPStatus.BAD_REQUEST,
+                    'error': 'Batch body must be an object with "operations"'
+                }
+            operations = data.get('operations')
+            if not isinstance(operations, list) or not operations:
+                return {
+                    'status': HTTPStatus.BAD_REQUEST,
+                    'error': 'Missing required field: operations'
+                }
+            if len(operations) > MAX_BATCH_OPERATIONS:
+                return {
+                    'status': HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                    'error': f'Too many operations, at most {MAX_BATCH_OPERATIONS} are allowed'
+                }
+            atomic = bool(data.get('atomic', False))
+            
+            # Run every operation through its usual handler, staging its writes
+            staging = StagedRepository(self.repository)
+            handler = _StagedAPIHandler(staging)
+            results = []
+            for index, operation in enumerate(operations):
+                staging.operation = index
+                result = handler._run_operation(operation)
+                if atomic and result['status'] not in (HTTPStatus.OK, HTTPStatus.CREATED):
+                    return {
+                        'status': result['status'],
+                        'error': f"Operation {index} failed: {result.get('error', '')}; no changes were applied"
+                    }
+                results.append(result)
+            
+            # Commit the staged writes, one apply() per collection
+            failed = staging.commit(atomic)
+            if atomic and failed:
+                if staging.rolled_back:
+                    logger.error("Atomic batch failed to save and was rolled back")
+                    error = 'Failed to save changes; no changes were applied'
+                else:
+                    logger.error("Atomic batch failed to save and could not be rolled back")
+                    error = 'Failed to save changes; some changes may have been applied'
+                for collection_name in staging.touched():
+                    get_response_cache().invalidate(collection_name)
+                return {'status': HTTPStatus.INTERNAL_SERVER_ERROR, 'error': error}
+            for index, result in enumerate(results):
+                if index in failed:
+                    results[index] = {
+                        'status': HTTPStatus.INTERNAL_SERVER_ERROR,
+                        'error': 'Failed to save changes'
+                    }
+                elif isinstance(result.get('data'), dict) and 'id' in result['data']:
+                    # Report written records as stored, with their change numbers
+                    record = staging.committed_record(index, result['data']['id'])
+                    if record is not None:
+                        result['data'] = record
+            for collection_name in staging.touched():
+                get_response_cache().invalidate(collection_name)
+            if failed:
+                logger.error(f"Batch writes of operations {sorted(failed)} failed")
+            
+            return {
+                'status': HTTPStatus.OK,
+                'data': {'results': results}
+            }
+        except Exception as e:
+            logger.error(f"Error running batch: {e}", exc_info=True)
+            return handle_api_error(e)
+    
+    def _run_operation(self, operation: Any) -> Dict[str, Any]:
+        """Run one batch operation, returning its {status, data | error} result"""
+        if not isinstance(operation, dict):
+            return {'status': HTTPStatus.BAD_REQUEST, 'error': 'Operation must be an object'}
+        method = str(operation.get('method', '')).upper()
+        path = operation.get('path')
+        body = operation.get('body', {})
+        if not isinstance(path, str) or not path.startswith('/api/'):
+            return {'status': HTTPStatus.BAD_REQUEST, 'error': 'Operation path must start with /api/'}
+        if not isinstance(body, dict):
+            return {'status': HTTPStatus.BAD_REQUEST, 'error': 'Operation body must be an object'}
+        
+        route, _, error = self._route(method, path)
+        if error:
+            return error
+        if route[0] is None:
+            # Only single-collection writes can be staged
+            return {'status': HTTPStatus.BAD_REQUEST, 'error': f'{path} cannot be used in a batch'}
+        if method == 'POST':
+            return self.handle_post(path, body)
+        if method == 'PUT':
+            return self.handle_put(path, body)
+        if method == 'DELETE':
+            return self.handle_delete(path)
+        return {'status': HTTPStatus.BAD_REQUEST, 'error': f'Unsupported operation method ({method})'}
+    
+    def _versioned(self, collection_names: Tuple[str, ...], path: str, params: Dict[str, Any],
+                   record_id: Optional[str], handler: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run a GET handler and tag a successful response with the data's version
+        
+        The version is read before the handler runs, so a concurrent write can
+        only make the tag older than the data, never newer. The encoded body
+        is cached per route and query; while the version is unchanged later
+        requests reuse it without running the handler at all.
+        
+        Args:
+            collection_names: The collection served, followed by any collections
+                embedded into the response; the tag covers all of them
+            path: Request path
+            params: Normalized query parameters
+            record_id: ID of the record served from the first collection, if any
+            handler: Builds the response
+        
+        Returns:
+            The handler's response, with 'etag', 'last_modified' and the
+            cache key added. A cached response carries its encoded 'body';
+            otherwise the data is only encoded, and the entry cached, by
+            http_common.encode_api_response() once it knows the client does
+            not already have this version.
+        """
+        collection = self.repository.collection(collection_names[0])
+        version = collection.item_version(record_id) if record_id else collection.version()
+        if version is None:
+            return handler()
+        if len(collection_names) > 1:
+            versions = [version] + [self.repository.collection(name).version() for name in collection_names[1:]]
+            tags = '+'.join(tag for tag, _ in versions)
+            version = (hashlib.sha256(tags.encode('utf-8')).hexdigest()[:16],
+                       max(modified for _, modified in versions))
+        
+        cache = get_response_cache()
+        key = (path, tuple(sorted((name, str(value)) for name, value in params.items())))
+        cached = cache.get(key, version[0])
+        if cached is not None:
+            return {
+                'status': HTTPStatus.OK,
+                'etag': cached.etag,
+                'last_modified': cached.last_modified,
+                'body': cached.body,
+                'cache_key': key
+            }
+        
+        response = handler()
+        if response['status'] == HTTPStatus.OK:
+            response['etag'], response['last_modified'] = version
+            response['cache_key'] = key
+            response['cache_collections'] = collection_names
+        return response
+    
+    def _invalidating(self, collection_name: Optional[str], response: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop cached responses of a collection after a successful write to it"""
+        # Routes spanning several collections invalidate for themselves
+        if collection_name and response['status'] in (HTTPStatus.OK, HTTPStatus.CREATED):
+            get_response_cache().invalidate(collection_name)
+        return response
+    
+    def _with_includes(self, collection_name: str, record: Dict[str, Any],
+                       params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Embed the related records named by the include parameter into a record
+        
+        Related records are found through the secondary indexes on their
+        reference field. Lectures are ordered by their 'order'; list-style
+        HEAVY_FIELDS are left out of embedded records.
+        
+        Returns:
+            A copy of the record with one list per included collection, or
+            the record itself if nothing is included
+        """
+        includes = params.get('include')
+        if not includes:
+            return record
+        
+        record = dict(record)
+        for name in includes.split(','):
+            related = self.repository.collection(name).find({INCLUDES[collection_name][name]: record['id']})
+            if name == 'lectures':
+                related = sorted(related, key=lambda lecture: lecture.get('order', 0))
+            heavy = HEAVY_FIELDS[name]
+            record[name] = [{key: value for key, value in item.items() if key not in heavy} for item in related]
+        return record
+    
+    def _list_response(self, collection: Any, filters: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Filter, sort and paginate the records of a list endpoint
+        
+        Requests with after or limit are paged by cursor (see _cursor_page),
+        all others by page number.
+        
+        Args:
+            collection: Collection listed
+            filters: Exact field filters, e.g. the course_id of lectures
+            params: Query parameters; category, sort, page and per_page are used
+            
+        Returns:
+            API response whose data is the page built by paginate_items
+            
+        Raises:
+            APIError: If page or per_page is not a positive integer
+        """
+        if 'after' in params or 'limit' in params:
+            return self._cursor_page(collection, filters, params)
+        
+        items = filter_by_category(collection.find(filters), params.get('category', ''))
+        items = sort_items(items, params.get('sort', ''))
+        page = self._positive_int_param(params, 'page', 1)
+        per_page = min(self._positive_int_param(params, 'per_page', DEFAULT_PER_PAGE), MAX_PER_PAGE)
+        return {
+            'status': HTTPStatus.OK,
+            'data': paginate_items(items, page, per_page)
+        }
+    
+    def _cursor_page(self, collection: Any, filters: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the page of records after a cursor
+        
+        Pages follow one of the orderings the data layer keeps sorted
+        (order=created or title, prefixed with '-' for descending), so a page
+        costs its own size however deep it is, and records created meanwhile
+        do not shift the pages that follow.
+        
+        Args:
+            collection: Collection listed
+            filters: Exact field filters, e.g. the course_id of lectures
+            params: Query parameters; order, after, limit and category are used
+            
+        Returns:
+            API response whose data holds the records, the limit and the
+            cursor of the next page (None after the last page)
+            
+        Raises:
+            APIError: If order, after or limit is invalid
+        """
+        order = params.get('order') or DEFAULT_ORDER
+        ordering = order[1:] if order.startswith('-') else order
+        if ordering not in ORDERINGS:
+            raise APIError(f"Invalid order: use {', '.join(ORDERINGS)}, optionally prefixed with '-'",
+                           HTTPStatus.BAD_REQUEST)
+        limit = min(self._positive_int_param(params, 'limit', DEFAULT_PER_PAGE), MAX_PER_PAGE)
+        
+        after = None
+        if params.get('after'):
+            try:
+                cursor_order, value, record_id = decode_cursor(params['after'])
+            except ValueError:
+                raise APIError('Invalid cursor', HTTPStatus.BAD_REQUEST)
+            if not (isinstance(value, str) and isinstance(record_id, str)):
+                raise APIError('Invalid cursor', HTTPStatus.BAD_REQUEST)
+            if cursor_order != order:
+                raise APIError('Cursor belongs to a different order', HTTPStatus.BAD_REQUEST)
+            after = (value, record_id)
+        
+        category = params.get('category')
+        if category and category != 'all':
+            filters = {**filters, 'category': category}
+        records, last = collection.page(ordering, after, limit, filters, descending=order.startswith('-'))
+        return {
+            'status': HTTPStatus.OK,
+            'data': {
+                'items': records,
+                'limit': limit,
+                'next': encode_cursor([order, *last]) if last else None
+            }
+        }
+    
+    def _names_param(self, params: Dict[str, Any], name: str) -> Tuple[str, ...]:
+        """
+        Read a comma-separated list parameter as sorted, distinct names
+        
+        The parameter is rewritten in params in that form, so listing the
+        same names in another order reuses the same response cache entry.
+        """
+        value = params.pop(name, None) or ''
+        names = tuple(sorted({item.strip() for item in value.split(',') if item.strip()}))
+        if names:
+            params[name] = ','.join(names)
+        return names
+    
+    def _project(self, collection_name: str, fields: Tuple[str, ...], includes: Tuple[str, ...],
+                 is_list: bool, response: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Reduce the records of a successful GET response to the fields the client needs
+        
+        Args:
+            collection_name: Collection the records come from
+            fields: Fields to keep, the id is always kept; empty for the default
+            includes: Embedded collections, kept like the id
+            is_list: Whether the response is a page of records rather than one record
+            response: Handler response
+            
+        Returns:
+            The response with projected copies of its records. Without fields,
+            list responses leave out the collection's HEAVY_FIELDS and single
+            records are returned whole.
+        """
+        if response['status'] != HTTPStatus.OK:
+            return response
+        if fields:
+            keep = set(fields) | set(includes) | {'id'}
+            project = lambda record: {key: value for key, value in record.items() if key in keep}
+        elif is_list and HEAVY_FIELDS[collection_name]:
+            heavy = HEAVY_FIELDS[collection_name]
+            project = lambda record: {key: value for key, value in record.items() if key not in heavy}
+        else:
+            return response
+        
+        # Records are shared with the data layer, so project into new dicts
+        data = response['data']
+        if is_list:
+            response['data'] = {**data, 'items': [project(record) for record in data['items']]}
+        else:
+            response['data'] = project(data)
+        return response
+    
+    def _positive_int_param(self, params: Dict[str, Any], name: str, default: int) -> int:
+        """Read a positive integer query parameter"""
+        value = params.get(name)
+        if value is None or value == '':
+            return default
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            number = 0
+        if number < 1:
+            raise APIError(f'Invalid {name}: must be a positive integer', HTTPStatus.BAD_REQUEST)
+        return number
+    
+    def _matches_filters(self, record: Dict[str, Any], params: Dict[str, Any], fields: tuple) -> bool:
+        """Check a record against the filter fields present in params"""
+        for field in fields:
+            if params.get(field) and record.get(field) != params[field]:
+                return False
+        return True
+    
+    def _new_id(self, collection_name: str, data: Dict[str, Any]) -> str:
+        """ID for a record being created in a collection"""
+        return generate_id()
+    
     def _get_current_timestamp(self) -> str:
         """Get current timestamp in ISO format"""
         from datetime import datetime
-        return datetime.now().isoformat()
\ No newline at end of file
+        return datetime.now().isoformat()
+
+class _StagedAPIHandler(APIHandler):
+    """APIHandler whose writes go to a staging area instead of the repository"""
+    
+    def __init__(self, staging: StagedRepository):
+        """Initialize handler over a staging area"""
+        self.staging = staging
+    
+    @property
+    def repository(self):
+        """Staging area of the batch"""
+        return self.staging
+    
+    def _invalidating(self, collection_name: Optional[str], response: Dict[str, Any]) -> Dict[str, Any]:
+        """Nothing is written yet; the batch invalidates after committing"""
+        return response
+
+class _ImportAPIHandler(_StagedAPIHandler):
+    """Staged handler that keeps the ids of imported records"""
+    
+    def _new_id(self, collection_name: str, data: Dict[str, Any]) -> str:
+        """Use the record's own id if it has one, so imported records can reference each other"""
+        record_id = data.get('id')
+        if record_id is None:
+            return generate_id()
+        if not isinstance(record_id, str) or not is_valid_id(record_id):
+            raise APIError('Invalid id: must be 32 hexadecimal characters', HTTPStatus.BAD_REQUEST)
+        if self.repository.collection(collection_name).get(record_id) is not None:
+            raise APIError('A record with this id already exists', HTTPStatus.CONFLICT)
+        return record_id
+
+class BulkImport:
+    """
+    Incremental NDJSON import of courses, lectures, notes and quizzes
+    
+    Every line is {"collection": "lectures", "data": {...}} and is validated
+    by that collection's create handler; a valid 32-character hex "id" in
+    the data is kept. Feed the request body to feed() as it arrives and call
+    finish() at the end. Only the current line and one batch of staged
+    records are held in memory. Every IMPORT_BATCH_SIZE accepted lines are
+    written with one apply() per collection.
+    """
+    
+    def __init__(self, api_handler: APIHandler, batch_size: int = IMPORT_BATCH_SIZE):
+        """
+        Initialize import
+        
+        Args:
+            api_handler: Handler whose repository receives the records
+            batch_size: Accepted lines staged before they are written
+        """
+        self.repository = api_handler.repository
+        self.batch_size = batch_size
+        self.lines = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._buffer = bytearray()
+        # Set while discarding the rest of an overlong line
+        self._skipping = False
+        self._new_batch()
+    
+    def feed(self, chunk: bytes) -> None:
+        """Process the complete lines of the next piece of the body"""
+        if self._skipping:
+            # The overlong line was already counted: drop it up to its end
+            end = chunk.find(b'\n')
+            if end < 0:
+                return
+            chunk = chunk[end + 1:]
+            self._skipping = False
+        
+        self._buffer += chunk
+        start = 0
+        while True:
+            end = self._buffer.find(b'\n', start)
+            if end < 0:
+                break
+            if end - start > MAX_IMPORT_LINE_BYTES:
+                self._reject_overlong()
+            else:
+                self._process(bytes(self._buffer[start:end]))
+            start = end + 1
+        del self._buffer[:start]
+        
+        if len(self._buffer) > MAX_IMPORT_LINE_BYTES:
+            self._reject_overlong()
+            self._buffer.clear()
+            self._skipping = True
+    
+    def finish(self, complete: bool = True) -> Dict[str, Any]:
+        """
+        Write the last batch and summarize the import
+        
+        Args:
+            complete: Whether the whole body arrived; an unterminated last
+                line is only imported if it did
+            
+        Returns:
+            API response whose data counts the lines, accepted and rejected
+            records, and lists the first MAX_IMPORT_ERRORS rejected lines
+        """
+        if complete and self._buffer and not self._skipping:
+            self._process(bytes(self._buffer))
+        self._buffer.clear()
+        self._flush()
+        return {
+            'status': HTTPStatus.OK,
+            'data': {
+                'lines': self.lines,
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'errors': self.errors
+            }
+        }
+    
+    def _process(self, line: bytes) -> None:
+        """Validate one line and stage its record"""
+        self.lines += 1
+        if not line.strip():
+            return
+        try:
+            item = json.loads(line)
+        except ValueError:
+            self._reject(HTTPStatus.BAD_REQUEST, 'Invalid JSON data')
+            return
+        if not isinstance(item, dict) or not isinstance(item.get('data'), dict):
+            self._reject(HTTPStatus.BAD_REQUEST, 'Line must be an object with "collection" and "data"')
+            return
+        route, _, _ = ROUTER.match('POST', f"/{item.get('collection')}")
+        if route is None or route[0] is None:
+            self._reject(HTTPStatus.BAD_REQUEST, f"Unknown collection: {item.get('collection')}")
+            return
+        
+        self._staging.operation = self.lines
+        result = route[1](self._handler, item['data'])
+        if result['status'] != HTTPStatus.CREATED:
+            self._reject(result['status'], result.get('error', ''))
+            return
+        self._staged += 1
+        if self._staged >= self.batch_size:
+            self._flush()
+    
+    def _flush(self) -> None:
+        """Write the staged batch and start a new one"""
+        if self._staged:
+            failed = self._staging.commit()
+            for line in sorted(failed):
+                self._reject(HTTPStatus.INTERNAL_SERVER_ERROR, 'Failed to save record', line)
+            self.accepted += self._staged - len(failed)
+            for collection_name in self._staging.touched():
+                get_response_cache().invalidate(collection_name)
+            logger.info(f"Imported {self._staged - len(failed)} records up to line {self.lines}")
+        self._new_batch()
+    
+    def _new_batch(self) -> None:
+        """Start staging a new batch"""
+        self._staging = StagedRepository(self.repository)
+        self._handler = _ImportAPIHandler(self._staging)
+        self._staged = 0
+    
+    def _reject_overlong(self) -> None:
+        """Count and reject a line longer than MAX_IMPORT_LINE_BYTES"""
+        self.lines += 1
+        self._reject(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f'Line longer than {MAX_IMPORT_LINE_BYTES} bytes')
+    
+    def _reject(self, status: int, error: str, line: Optional[int] = None) -> None:
+        """Count a rejected line, keeping its error while the error list is not full"""
+        self.rejected += 1
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append({
+                'line': line if line is not None else self.lines,
+                'status': status,
+                'error': error
+            })
+
+# API routes: method, path pattern (relative to /api), collection, handler.
+# Compiled once into a routing tree shared by every APIHandler.
+ROUTES = [
+    ('GET', '/courses', 'courses', APIHandler._handle_get_courses),
+    ('GET', '/courses/{course_id}', 'courses', APIHandler._handle_get_courses),
+    ('POST', '/courses', 'courses', APIHandler._handle_create_course),
+    ('PUT', '/courses/{course_id}', 'courses', APIHandler._handle_update_course),
+    ('DELETE', '/courses/{course_id}', 'courses', APIHandler._handle_delete_course),
+    ('GET', '/lectures', 'lectures', APIHandler._handle_get_lectures),
+    ('GET', '/lectures/{lecture_id}', 'lectures', APIHandler._handle_get_lectures),
+    ('POST', '/lectures', 'lectures', APIHandler._handle_create_lecture),
+    ('PUT', '/lectures/{lecture_id}', 'lectures', APIHandler._handle_update_lecture),
+    ('DELETE', '/lectures/{lecture_id}', 'lectures', APIHandler._handle_delete_lecture),
+    ('GET', '/notes', 'notes', APIHandler._handle_get_notes),
+    ('GET', '/notes/{note_id}', 'notes', APIHandler._handle_get_notes),
+    ('POST', '/notes', 'notes', APIHandler._handle_create_note),
+    ('PUT', '/notes/{note_id}', 'notes', APIHandler._handle_update_note),
+    ('DELETE', '/notes/{note_id}', 'notes', APIHandler._handle_delete_note),
+    ('GET', '/quizzes', 'quizzes', APIHandler._handle_get_quizzes),
+    ('GET', '/quizzes/{quiz_id}', 'quizzes', APIHandler._handle_get_quizzes),
+    ('POST', '/quizzes', 'quizzes', APIHandler._handle_create_quiz),
+    ('PUT', '/quizzes/{quiz_id}', 'quizzes', APIHandler._handle_update_quiz),
+    ('DELETE', '/quizzes/{quiz_id}', 'quizzes', APIHandler._handle_delete_quiz),
+    ('POST', '/batch', None, APIHandler._handle_batch),
+    ('GET', '/export/{collection}', None, APIHandler._handle_export),
+    ('GET', '/sync', None, APIHandler._handle_sync)
+]
+
+ROUTER = Router()
+for _method, _pattern, _collection_name, _handler in ROUTES:
+    ROUTER.add(_method, _pattern, (_collection_name, _handler))
+
+# Names of the API routes for access logs and metrics, including the
+# streamed import that the servers handle themselves
+ROUTE_NAMES = Router()
+for _method, _pattern, *_ in ROUTES + [('POST', '/import')]:
+    ROUTE_NAMES.add(_method, _pattern, '/api' + _pattern)
+
+def route_name(method: str, path: str) -> str:
+    """
+    Name the route serving a request, for access logs and metrics
+
+    API requests are named by their route pattern, e.g.
+    '/api/courses/{course_id}', so there are few names however many records
+    exist. Other API requests are 'unmatched', the metrics endpoint is
+    named by its path and everything else is 'static'.
+    """
+    if path == METRICS_PATH:
+        return path
+    if not path.startswith('/api/'):
+        return 'static'
+    # HEAD requests are served by the GET routes
+    name, _, _ = ROUTE_NAMES.match('GET' if method == 'HEAD' else method, path[4:])
+    return name or 'unmatched'
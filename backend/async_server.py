@@ -0,0 +1,437 @@
+# =====================================================================================
+# File: EduBridge/backend/async_server.py
+# Description: asyncio server engine for EduBridge
+# Created: 2026-10-17 15:00:00
+# Last Modified: 2026-10-17 15:00:00
+# =====================================================================================
+
+import asyncio
+import email.utils
+import http.client
+import io
+import signal
+import time
+import types
+import urllib.parse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Import our modules
+from api import APIHandler, BulkImport, route_name
+from logging_setup import log_access
+from metrics import record_request, request_finished, request_started
+from static_cache import StaticResponse, get_static_cache
+from http_common import (EncodedResponse, encode_api_response, encode_error_response,
+                         encode_metrics_response, encode_options_response, body_framing_error,
+                         parse_chunk_size, parse_json_body, parse_query, BODY_CHUNK_BYTES,
+                         IMPORT_PATH, MAX_BODY_BYTES, MAX_CHUNK_LINE_BYTES, METRICS_PATH)
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Default number of connections served at once before new ones get 503
+DEFAULT_MAX_CONNECTIONS = 1024
+
+# Seconds an idle keep-alive connection may wait for its next request, and
+# the longest a request in progress may go without sending anything
+KEEP_ALIVE_TIMEOUT = 15
+
+# Largest request head accepted
+MAX_HEADER_BYTES = 64 * 1024
+
+# Size of the socket write buffer above which responses wait for the client
+WRITE_BUFFER_HIGH_WATER = 256 * 1024
+
+# Seconds in-flight requests get to finish when the server stops
+SHUTDOWN_GRACE = 5.0
+
+_REJECT_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Length: 0\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n\r\n"
+)
+
+class _BadRequest(Exception):
+    """A request that cannot be parsed; answered with the given status and closed"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+async def _read_within(read: Any) -> Any:
+    """Await one read of a request in progress, answering a stall with 408"""
+    try:
+        return await asyncio.wait_for(read, KEEP_ALIVE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise _BadRequest(HTTPStatus.REQUEST_TIMEOUT, "Request timed out")
+
+async def _body_chunks(reader: asyncio.StreamReader, headers: http.client.HTTPMessage):
+    """
+    Yield a request body in pieces as it arrives
+
+    Both Content-Length and chunked transfer encoding are supported. Every
+    read waits at most KEEP_ALIVE_TIMEOUT seconds, so a slow client is
+    served as long as it keeps sending.
+
+    Raises:
+        _BadRequest: If the body is malformed, ends early or stalls
+    """
+    async def read_line() -> bytes:
+        try:
+            return await _read_within(reader.readuntil(b'\n'))
+        except asyncio.IncompleteReadError:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "Incomplete request body")
+        except asyncio.LimitOverrunError:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "Malformed chunked request body")
+
+    async def read_exactly(length: int):
+        while length > 0:
+            data = await _read_within(reader.read(min(length, BODY_CHUNK_BYTES)))
+            if not data:
+                raise _BadRequest(HTTPStatus.BAD_REQUEST, "Incomplete request body")
+            length -= len(data)
+            yield data
+
+    if not headers.get('Transfer-Encoding'):
+        try:
+            content_length = int(headers.get('Content-Length', 0))
+        except ValueError:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        async for data in read_exactly(content_length):
+            yield data
+        return
+
+    while True:
+        line = await read_line()
+        if len(line) > MAX_CHUNK_LINE_BYTES:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "Malformed chunked request body")
+        try:
+            size = parse_chunk_size(line)
+        except ValueError as e:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, str(e))
+        if size == 0:
+            # Skip any trailer fields up to the blank line ending the body
+            while (await read_line()).strip():
+                pass
+            return
+        async for data in read_exactly(size):
+            yield data
+        await read_line()
+
+class AsyncEduBridgeServer:
+    """
+    Single-threaded asyncio HTTP/1.1 server
+
+    One event loop owns every connection, so thousands of idle keep-alive
+    clients cost a coroutine each instead of a thread. Request handling that
+    blocks - the APIHandler, the repository and opening large static files -
+    runs on a small thread pool so the loop keeps serving other connections.
+    """
+
+    def __init__(self, port: int = 8000, threads: int = 16,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS, listening_socket=None):
+        """
+        Initialize server
+
+        Args:
+            port: Port to listen on when no listening socket is given
+            threads: Size of the pool running blocking request handling
+            max_connections: Open connections allowed before new ones get 503
+            listening_socket: Already bound socket inherited from a pre-forked parent
+        """
+        self.port = port
+        self.threads = threads
+        self.max_connections = max_connections
+        self.listening_socket = listening_socket
+        # Stateless, shared by every request
+        self.api_handler = APIHandler()
+        self._connections = set()
+        self._busy = set()
+        self._stopping = False
+
+    def serve_forever(self) -> None:
+        """Serve until SIGTERM (or SIGINT where it is not ignored)"""
+        asyncio.run(self._main())
+
+    async def _main(self) -> None:
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='async-worker')
+        loop.set_default_executor(executor)
+
+        stopped = asyncio.Event()
+        loop.add_signal_handler(signal.SIGTERM, stopped.set)
+        if signal.getsignal(signal.SIGINT) is not signal.SIG_IGN:
+            loop.add_signal_handler(signal.SIGINT, stopped.set)
+
+        if self.listening_socket is not None:
+            server = await asyncio.start_server(self._handle_connection, sock=self.listening_socket,
+                                                limit=MAX_HEADER_BYTES)
+        else:
+            server = await asyncio.start_server(self._handle_connection, port=self.port,
+                                                reuse_address=True, backlog=128,
+                                                limit=MAX_HEADER_BYTES)
+            logger.info(f"Visit http://localhost:{self.port} to access the application")
+        logger.info(f"EduBridge asyncio server started on port {self.port} with {self.threads} worker threads")
+
+        try:
+            await stopped.wait()
+            logger.info("Server stopped by user")
+        finally:
+            self._stopping = True
+            server.close()
+            # Idle keep-alive connections are dropped at once, requests in
+            # progress get a grace period to finish
+            for task in self._connections - self._busy:
+                task.cancel()
+            if self._connections:
+                await asyncio.wait(set(self._connections), timeout=SHUTDOWN_GRACE)
+            await server.wait_closed()
+            executor.shutdown(wait=True)
+            logger.info("Server closed")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the requests of one connection"""
+        if len(self._connections) >= self.max_connections:
+            peer = writer.get_extra_info('peername') or ('?',)
+            logger.warning(f"Connection limit reached, rejecting connection from {peer[0]}")
+            writer.write(_REJECT_RESPONSE)
+            await self._close(writer)
+            return
+
+        task = asyncio.current_task()
+        self._connections.add(task)
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH_WATER)
+        try:
+            keep_alive = True
+            while keep_alive and not self._stopping:
+                try:
+                    request = await self._read_request(reader)
+                except _BadRequest as e:
+                    await self._write(writer, encode_error_response(e.status, e.message), False)
+                    break
+                if request is None:
+                    break
+
+                self._busy.add(task)
+                started = time.perf_counter()
+                request_started()
+                try:
+                    method, target, headers, body, keep_alive = request
+                    try:
+                        response = await self._respond(method, target, headers, body, reader)
+                    except _BadRequest as e:
+                        # A streamed body went wrong; where the next request starts is unknown
+                        response = encode_error_response(e.status, e.message)
+                        keep_alive = False
+                    keep_alive = keep_alive and not self._stopping
+                    sent = await self._write(writer, response, keep_alive, send_body=method != 'HEAD')
+                    path = urllib.parse.urlparse(target).path
+                    route = route_name(method, path)
+                    duration = time.perf_counter() - started
+                    log_access(method, route, path, response[0], sent, duration)
+                    record_request(method, route, response[0], sent, duration)
+                finally:
+                    request_finished()
+                    self._busy.discard(task)
+        except (asyncio.TimeoutError, asyncio.CancelledError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Error serving connection: {e}", exc_info=True)
+        finally:
+            self._connections.discard(task)
+            await self._close(writer)
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, http.client.HTTPMessage, bytes, bool]]:
+        """
+        Read one request from the connection
+
+        Only the wait for the request line is bounded as a whole, by the idle
+        timeout. Once a request has started, each read of its head and body
+        gets KEEP_ALIVE_TIMEOUT, so slow clients are served while they send.
+
+        Returns:
+            (method, target, headers, body, keep_alive), or None if the client
+            closed the connection, or stayed idle, between requests. The body
+            of an import is left unread for _respond() to stream and is
+            returned as None.
+
+        Raises:
+            _BadRequest: If the request is malformed, too large or stalls
+        """
+        try:
+            request_line = await asyncio.wait_for(reader.readuntil(b'\r\n'), KEEP_ALIVE_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise _BadRequest(HTTPStatus.BAD_REQUEST, "Incomplete request")
+            return None
+        except asyncio.LimitOverrunError:
+            raise _BadRequest(HTTPStatus.REQUEST_URI_TOO_LONG, "Request line too long")
+
+        header_lines = []
+        size = len(request_line)
+        while True:
+            try:
+                line = await _read_within(reader.readuntil(b'\r\n'))
+            except asyncio.IncompleteReadError:
+                raise _BadRequest(HTTPStatus.BAD_REQUEST, "Incomplete request")
+            except asyncio.LimitOverrunError:
+                raise _BadRequest(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers too large")
+            size += len(line)
+            if size > MAX_HEADER_BYTES:
+                raise _BadRequest(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers too large")
+            if line == b'\r\n':
+                break
+            header_lines.append(line)
+
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        if version not in ('HTTP/1.0', 'HTTP/1.1'):
+            raise _BadRequest(HTTPStatus.HTTP_VERSION_NOT_SUPPORTED, "HTTP version not supported")
+        try:
+            headers = http.client.parse_headers(io.BytesIO(b''.join(header_lines) + b'\r\n'))
+        except http.client.HTTPException:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "Malformed headers")
+
+        # Same framing checks and statuses as the threaded engine
+        streamed = method.upper() == 'POST' and urllib.parse.urlparse(target).path == IMPORT_PATH
+        error = body_framing_error(headers, None if streamed else MAX_BODY_BYTES)
+        if error is not None:
+            raise _BadRequest(*error)
+
+        body = None
+        if not streamed:
+            data = bytearray()
+            async for chunk in _body_chunks(reader, headers):
+                data += chunk
+                if len(data) > MAX_BODY_BYTES:
+                    raise _BadRequest(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+            body = bytes(data)
+
+        connection = headers.get('Connection', '').lower()
+        if version == 'HTTP/1.1':
+            keep_alive = connection != 'close'
+        else:
+            keep_alive = connection == 'keep-alive'
+        return method.upper(), target, headers, body, keep_alive
+
+    async def _respond(self, method: str, target: str, headers: http.client.HTTPMessage,
+                       body: Optional[bytes], reader: asyncio.StreamReader) -> Union[EncodedResponse, StaticResponse]:
+        """
+        Produce the response to one request
+
+        Raises:
+            _BadRequest: If a streamed body is malformed; the connection must then be closed
+        """
+        loop = asyncio.get_running_loop()
+        parsed_url = urllib.parse.urlparse(target)
+        path = parsed_url.path
+
+        if method == 'OPTIONS':
+            return encode_options_response()
+
+        if body is None:
+            return await self._import(reader, headers)
+
+        if path.startswith('/api/'):
+            # HEAD is answered like GET, _write() leaves out the body
+            if method not in ('GET', 'HEAD', 'POST', 'PUT', 'DELETE'):
+                return encode_error_response(HTTPStatus.NOT_IMPLEMENTED, f"Unsupported method ({method})")
+            try:
+                data = parse_json_body(body, headers.get('Content-Type'))
+            except ValueError as e:
+                return encode_error_response(HTTPStatus.BAD_REQUEST, str(e))
+            response = await loop.run_in_executor(None, self._call_api, method, path,
+                                                  parse_query(parsed_url.query), data)
+            return encode_api_response(response, headers)
+
+        if method in ('GET', 'HEAD') and path == METRICS_PATH:
+            return encode_metrics_response(get_static_cache().stats(), headers)
+
+        if method in ('GET', 'HEAD'):
+            # Cached files are answered on the loop, only large files touch the disk
+            asset = get_static_cache().lookup(path)
+            if asset is not None and asset.body is None:
+                return await loop.run_in_executor(None, get_static_cache().respond, path, headers)
+            return get_static_cache().respond(path, headers)
+        if method in ('POST', 'PUT', 'DELETE'):
+            return encode_error_response(HTTPStatus.NOT_FOUND, "Endpoint not found")
+        return encode_error_response(HTTPStatus.NOT_IMPLEMENTED, f"Unsupported method ({method})")
+
+    async def _import(self, reader: asyncio.StreamReader, headers: http.client.HTTPMessage) -> EncodedResponse:
+        """Stream an NDJSON import body into a BulkImport, processing it on the thread pool"""
+        loop = asyncio.get_running_loop()
+        bulk_import = BulkImport(self.api_handler)
+        try:
+            async for chunk in _body_chunks(reader, headers):
+                await loop.run_in_executor(None, bulk_import.feed, chunk)
+        except _BadRequest as e:
+            summary = (await loop.run_in_executor(None, bulk_import.finish, False))['data']
+            raise _BadRequest(e.status, f"{e.message}; {summary['accepted']} records from the "
+                                        f"first {summary['lines']} lines were imported")
+        response = await loop.run_in_executor(None, bulk_import.finish)
+        return encode_api_response(response, headers)
+
+    def _call_api(self, method: str, path: str, params: Dict[str, str],
+                  data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run an API request on a worker thread"""
+        api_handler = self.api_handler
+        if method in ('GET', 'HEAD'):
+            return api_handler.handle_get(path, params)
+        if method == 'POST':
+            return api_handler.handle_post(path, data)
+        if method == 'PUT':
+            return api_handler.handle_put(path, data)
+        return api_handler.handle_delete(path)
+
+    async def _write(self, writer: asyncio.StreamWriter, response: Union[EncodedResponse, StaticResponse],
+                     keep_alive: bool, send_body: bool = True) -> int:
+        """Send a response, waiting while the client is slow to read, and return the body bytes sent"""
+        status, headers, body = response
+        sent = 0
+        try:
+            status = HTTPStatus(status)
+            lines: List[str] = [f"HTTP/1.1 {status.value} {status.phrase}"]
+            lines.extend(f"{name}: {value}" for name, value in headers)
+            lines.append(f"Date: {email.utils.formatdate(usegmt=True)}")
+            if not keep_alive:
+                lines.append("Connection: close")
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            if send_body and isinstance(body, bytes):
+                if body:
+                    writer.write(body)
+                sent = len(body)
+            elif send_body and isinstance(body, types.GeneratorType):
+                # Streamed body: pieces are produced on the thread pool since they read the data layer
+                loop = asyncio.get_running_loop()
+                while True:
+                    chunk = await loop.run_in_executor(None, next, body, None)
+                    if chunk is None:
+                        break
+                    writer.write(chunk)
+                    sent += len(chunk)
+                    await writer.drain()
+            elif send_body:
+                # Large static file: flush the headers, then let the kernel copy the file
+                await writer.drain()
+                sent = await asyncio.get_running_loop().sendfile(writer.transport, body)
+            await writer.drain()
+        finally:
+            if not isinstance(body, bytes):
+                body.close()
+        return sent
+
+    async def _close(self, writer: asyncio.StreamWriter) -> None:
+        """Close a connection, ignoring clients that already went away"""
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
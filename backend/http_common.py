@@ -0,0 +1,379 @@
+# =====================================================================================
+# File: EduBridge/backend/http_common.py
+# Description: Request and response handling shared by the EduBridge server engines
+# Created: 2026-10-17 15:00:00
+# Last Modified: 2026-10-17 15:00:00
+# =====================================================================================
+
+import email.utils
+import gzip
+import json
+import os
+import posixpath
+import urllib.parse
+import zlib
+from http import HTTPStatus
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+# Import our modules
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from repository import get_repository
+from response_cache import CachedResponse, get_response_cache
+
+# Headers sent with every API response
+CORS_HEADERS = [
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS'),
+    ('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+]
+
+# Friendly URLs served by frontend pages
+PAGE_ALIASES = {
+    '/': '/index.html',
+    '/courses': '/courses.html',
+    '/about': '/about.html'
+}
+
+# Endpoint whose request body is streamed to the handler instead of read up front
+IMPORT_PATH = '/api/import'
+
+# Endpoint serving metrics in the Prometheus text format
+METRICS_PATH = '/metrics'
+
+# Size of the pieces a streamed request body is read in, and the longest chunk-size line
+BODY_CHUNK_BYTES = 64 * 1024
+MAX_CHUNK_LINE_BYTES = 1024
+
+# Largest request body read into memory; streamed imports are not limited
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# An encoded response: status, headers and body bytes, or a generator of the
+# already framed pieces of a chunked body
+EncodedResponse = Tuple[int, List[Tuple[str, str]], Union[bytes, Iterator[bytes]]]
+
+# Content codings offered for API responses, in order of preference
+API_ENCODINGS = ('gzip', 'deflate')
+
+# API bodies smaller than this are sent uncompressed
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+
+# zlib level used for API responses; 0 disables compression
+DEFAULT_COMPRESS_LEVEL = 6
+
+# Compression settings, set at startup by configure_compression()
+_compression = {
+    'min_bytes': DEFAULT_COMPRESS_MIN_BYTES,
+    'level': DEFAULT_COMPRESS_LEVEL
+}
+
+def configure_compression(min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES,
+                          level: int = DEFAULT_COMPRESS_LEVEL) -> None:
+    """Set the size threshold and level of API response compression"""
+    if not 0 <= level <= 9:
+        raise ValueError(f"Compression level must be between 0 and 9: {level}")
+    _compression['min_bytes'] = min_bytes
+    _compression['level'] = level
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q-value}"""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+def choose_encoding(request_headers: Any, offered: Tuple[str, ...] = API_ENCODINGS) -> Optional[str]:
+    """Pick the preferred offered content coding the client accepts, or None"""
+    header = request_headers.get('Accept-Encoding') if request_headers is not None else None
+    if not header or not _compression['level']:
+        return None
+    accepted = parse_accept_encoding(header)
+    for encoding in offered:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body with the configured level"""
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=_compression['level'], mtime=0)
+    return zlib.compress(body, _compression['level'])
+
+class StreamCompressor:
+    """
+    Incremental compressor for responses sent in pieces
+
+    Use compress() for every chunk and flush() after the last one. Each
+    call returns the compressed bytes ready to send, which may be empty.
+    """
+
+    def __init__(self, encoding: str):
+        """Initialize compressor for 'gzip' or 'deflate'"""
+        # wbits selects the gzip or zlib container, matching compress()
+        wbits = 31 if encoding == 'gzip' else 15
+        self.encoding = encoding
+        self._compressor = zlib.compressobj(_compression['level'], zlib.DEFLATED, wbits)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compress one chunk, flushing so the client can decode it right away"""
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def flush(self) -> bytes:
+        """Finish the stream"""
+        return self._compressor.flush()
+
+def parse_query(query: str) -> Dict[str, str]:
+    """Parse a query string into {name: value}, keeping the first value of repeated names"""
+    params = {}
+    for name, value in urllib.parse.parse_qsl(query):
+        params.setdefault(name, value)
+    return params
+
+def parse_chunk_size(line: bytes) -> int:
+    """
+    Parse the size line of one chunk of a chunked request body
+
+    Raises:
+        ValueError: If the line is not a chunk size
+    """
+    size = line.split(b';', 1)[0].strip()
+    try:
+        value = int(size, 16)
+    except ValueError:
+        raise ValueError("Malformed chunked request body") from None
+    if value < 0:
+        raise ValueError("Malformed chunked request body")
+    return value
+
+def body_framing_error(request_headers: Any, max_bytes: Optional[int] = None) -> Optional[Tuple[int, str]]:
+    """
+    Check that a request body's framing can be read, before reading it
+
+    Bodies are framed by Content-Length or by chunked transfer coding.
+    Both engines answer a body they cannot read with the same status, and
+    must then close the connection since the next request cannot be found.
+
+    Args:
+        request_headers: Request headers (anything with a .get() method)
+        max_bytes: Largest Content-Length accepted, None for no limit
+
+    Returns:
+        (status, message) of the error response, or None if the body can be read
+    """
+    transfer_encoding = request_headers.get('Transfer-Encoding', '').strip().lower()
+    if transfer_encoding:
+        if transfer_encoding != 'chunked':
+            return HTTPStatus.NOT_IMPLEMENTED, f"Unsupported transfer encoding ({transfer_encoding})"
+        return None
+    try:
+        content_length = int(request_headers.get('Content-Length', 0))
+    except ValueError:
+        return HTTPStatus.BAD_REQUEST, "Invalid Content-Length"
+    if content_length < 0:
+        return HTTPStatus.BAD_REQUEST, "Invalid Content-Length"
+    if max_bytes is not None and content_length > max_bytes:
+        return HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large"
+    return None
+
+def parse_json_body(body: bytes, content_type: Optional[str]) -> Dict[str, Any]:
+    """
+    Parse a request body as JSON if it was sent as JSON
+
+    Raises:
+        ValueError: If the body is declared as JSON but cannot be parsed
+    """
+    if content_type != 'application/json':
+        return {}
+    try:
+        return json.loads(body.decode('utf-8'))
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid JSON data") from e
+
+def encode_api_response(response: Dict[str, Any], request_headers: Any = None) -> EncodedResponse:
+    """
+    Encode an APIHandler response dictionary
+
+    Responses tagged with a version get ETag and Last-Modified headers. If
+    the request's If-None-Match shows the client already has that version,
+    a 304 is returned without encoding the data. Bodies of at least the
+    configured size are compressed when the client accepts gzip or deflate;
+    compressed forms of cached responses are cached alongside them.
+
+    Args:
+        response: Response dictionary returned by APIHandler
+        request_headers: Request headers (anything with a .get() method)
+    """
+    vary = [('Vary', 'Accept-Encoding')]
+    if 'etag' in response and request_headers is not None:
+        matched = matching_etag(request_headers, response['etag'])
+        if matched is not None:
+            # Echo the representation the client holds: whether it was
+            # compressed depended on its size, which is not known here
+            encoding = matched[len(response['etag']) + 1:] or None
+            return HTTPStatus.NOT_MODIFIED, _validators(response, encoding) + vary + CORS_HEADERS, b''
+
+    if 'stream' in response:
+        return _encode_stream_response(response, request_headers)
+
+    # Encode response data, or the error if the request failed
+    if 'body' in response:
+        body = response['body']
+    elif 'data' in response:
+        body = json.dumps(response['data']).encode('utf-8')
+        if 'cache_collections' in response:
+            # Versioned response missing from the cache: keep its encoding
+            get_response_cache().put(response['cache_key'], response['cache_collections'],
+                                     CachedResponse(response['etag'], response['last_modified'], body))
+    else:
+        body = json.dumps({
+            'error': response.get('error', ''),
+            'status': response['status']
+        }).encode('utf-8')
+
+    headers = [('Content-Type', 'application/json')]
+    encoding = choose_encoding(request_headers) if len(body) >= _compression['min_bytes'] else None
+    if encoding:
+        body = _compressed_body(response, body, encoding)
+        headers.append(('Content-Encoding', encoding))
+    headers.append(('Content-Length', str(len(body))))
+    if 'etag' in response:
+        headers.extend(_validators(response, encoding))
+    return response['status'], headers + vary + CORS_HEADERS, body
+
+def _encode_stream_response(response: Dict[str, Any], request_headers: Any) -> EncodedResponse:
+    """Encode a response whose body is produced piece by piece, compressing it on the fly"""
+    headers = [('Content-Type', response['content_type'])]
+    chunks = response['stream']
+    encoding = choose_encoding(request_headers)
+    if encoding:
+        chunks = _compressed_chunks(chunks, StreamCompressor(encoding))
+        headers.append(('Content-Encoding', encoding))
+    headers.append(('Transfer-Encoding', 'chunked'))
+    return response['status'], headers + [('Vary', 'Accept-Encoding')] + CORS_HEADERS, chunked(chunks)
+
+def _compressed_chunks(chunks: Iterator[bytes], compressor: StreamCompressor) -> Iterator[bytes]:
+    """Compress the pieces of a streamed body"""
+    try:
+        for chunk in chunks:
+            yield compressor.compress(chunk)
+        yield compressor.flush()
+    finally:
+        chunks.close()
+
+def chunked(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Frame the pieces of a body with chunked transfer coding
+
+    Closing the returned generator closes the one it wraps, so an abandoned
+    response releases whatever its producer holds.
+    """
+    try:
+        for chunk in chunks:
+            # An empty chunk would end the body early
+            if chunk:
+                yield b'%x\r\n%s\r\n' % (len(chunk), chunk)
+        yield b'0\r\n\r\n'
+    finally:
+        chunks.close()
+
+def _validators(response: Dict[str, Any], encoding: Optional[str]) -> List[Tuple[str, str]]:
+    """ETag and Last-Modified headers of a versioned response"""
+    # Each content coding is a different representation with its own tag
+    etag = f"{response['etag']}-{encoding}" if encoding else response['etag']
+    return [
+        ('ETag', f'"{etag}"'),
+        ('Last-Modified', email.utils.formatdate(response['last_modified'], usegmt=True))
+    ]
+
+def _compressed_body(response: Dict[str, Any], body: bytes, encoding: str) -> bytes:
+    """Compress a body, reusing the compressed form kept with a cached response"""
+    cache_key = response.get('cache_key')
+    if cache_key is None:
+        return compress(body, encoding)
+    cache = get_response_cache()
+    compressed = cache.get_variant(cache_key, response['etag'], encoding)
+    if compressed is None:
+        compressed = compress(body, encoding)
+        cache.add_variant(cache_key, response['etag'], encoding, compressed)
+    return compressed
+
+def matching_etag(request_headers: Any, etag: str) -> Optional[str]:
+    """
+    Find the tag in a request's If-None-Match naming the current version
+
+    If-Modified-Since is deliberately not honoured for API data: with its
+    one-second resolution, two writes within a second would be missed.
+
+    Returns:
+        The matching tag without quotes, including any '-<coding>' suffix
+        (the plain etag for '*'), or None if the client's copy is stale
+    """
+    none_match = request_headers.get('If-None-Match')
+    if not none_match:
+        return None
+    # Tags of compressed representations carry a '-<coding>' suffix
+    accepted = {etag} | {f'{etag}-{encoding}' for encoding in API_ENCODINGS}
+    for tag in (tag.strip() for tag in none_match.split(',')):
+        if tag == '*':
+            return etag
+        tag = tag.removeprefix('W/').strip('"')
+        if tag in accepted:
+            return tag
+    return None
+
+def encode_error_response(status_code: int, message: str) -> EncodedResponse:
+    """Encode a JSON error response"""
+    body = json.dumps({
+        'error': message,
+        'status': status_code
+    }).encode('utf-8')
+
+    headers = [
+        ('Content-Type', 'application/json'),
+        ('Content-Length', str(len(body))),
+        ('Access-Control-Allow-Origin', '*')
+    ]
+    return status_code, headers, body
+
+def encode_metrics_response(static_stats: Dict[str, Any], request_headers: Any = None) -> EncodedResponse:
+    """
+    Encode the current metrics, compressed when the scraper accepts it
+
+    Args:
+        static_stats: stats() of the static file cache
+        request_headers: Request headers (anything with a .get() method)
+    """
+    body = render_metrics({'response': get_response_cache().stats(), 'static': static_stats},
+                          get_repository().stats()).encode('utf-8')
+    headers = [('Content-Type', METRICS_CONTENT_TYPE), ('Cache-Control', 'no-store')]
+    encoding = choose_encoding(request_headers) if len(body) >= _compression['min_bytes'] else None
+    if encoding:
+        body = compress(body, encoding)
+        headers.append(('Content-Encoding', encoding))
+    headers.append(('Content-Length', str(len(body))))
+    return HTTPStatus.OK, headers + [('Vary', 'Accept-Encoding')], body
+
+def encode_options_response() -> EncodedResponse:
+    """Encode the response to a CORS preflight request"""
+    return HTTPStatus.OK, CORS_HEADERS + [('Content-Length', '0')], b''
+
+def resolve_static_path(root: str, url_path: str) -> str:
+    """
+    Map a URL path onto a file below root
+
+    '..' segments are dropped so the result never escapes root. The disk is
+    not consulted: when the path names a directory, the caller looks for its
+    index.html, as SimpleHTTPRequestHandler does.
+    """
+    url_path = PAGE_ALIASES.get(url_path, url_path)
+    url_path = posixpath.normpath(urllib.parse.unquote(url_path))
+    parts = [part for part in url_path.split('/') if part and part not in ('.', '..')]
+    return os.path.join(root, *parts)
@@ -0,0 +1,164 @@
+# =====================================================================================
+# File: EduBridge/backend/logging_setup.py
+# Description: Queue-based logging and the sampled access log for EduBridge
+# Created: 2026-10-17 21:00:00
+# Last Modified: 2026-10-17 21:00:00
+# =====================================================================================
+
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import random
+from datetime import datetime
+from typing import Any, Dict
+
+# Log files written by the server
+SERVER_LOG = 'backend/logs/server.log'
+ACCESS_LOG = 'backend/logs/access.log'
+
+# Size at which a log file is rotated, and the number of rotated files kept
+DEFAULT_LOG_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_LOG_BACKUPS = 5
+
+# Fraction of requests written to the access log
+DEFAULT_ACCESS_SAMPLE = 1.0
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Logger of access log entries; they only go to ACCESS_LOG
+access_logger = logging.getLogger('access')
+
+# Listener and queue set up by configure_logging()
+_state: Dict[str, Any] = {
+    'listener': None,
+    'queue': None,
+    'pid': None,
+    'sample': DEFAULT_ACCESS_SAMPLE
+}
+
+class _ProcessQueue:
+    """
+    Queue shared with forked processes, with the methods QueueHandler and QueueListener use
+
+    Built on multiprocessing.SimpleQueue, which writes each record to the
+    pipe directly: multiprocessing.Queue's feeder thread would not survive
+    os.fork() in the workers.
+    """
+
+    def __init__(self):
+        self._queue = multiprocessing.SimpleQueue()
+
+    def put_nowait(self, item: Any) -> None:
+        self._queue.put(item)
+
+    def get(self, block: bool = True) -> Any:
+        return self._queue.get()
+
+class AccessFormatter(logging.Formatter):
+    """Formats access log entries as one JSON object per line"""
+
+    FIELDS = ('method', 'route', 'path', 'status', 'bytes', 'duration_ms')
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Encode the entry's fields, with the time the request finished"""
+        entry = {'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds')}
+        entry.update((field, getattr(record, field, None)) for field in self.FIELDS)
+        return json.dumps(entry)
+
+def configure_logging(max_bytes: int = DEFAULT_LOG_MAX_BYTES, backups: int = DEFAULT_LOG_BACKUPS,
+                      access_sample: float = DEFAULT_ACCESS_SAMPLE, processes: int = 1,
+                      level: int = logging.INFO) -> None:
+    """
+    Send every log record through a queue to a listener thread
+
+    Request threads only put records on the queue. A QueueListener formats
+    them and writes SERVER_LOG, the console and ACCESS_LOG, rotating the
+    files once they reach max_bytes. With several processes, configure
+    before forking: workers then put their records on a process-shared
+    queue and only this process writes the files, so rotation stays safe.
+
+    Args:
+        max_bytes: Size at which a log file is rotated
+        backups: Number of rotated files kept per log
+        access_sample: Fraction of requests written to the access log
+        processes: Number of processes that will log through the queue
+        level: Level of the root logger
+
+    Raises:
+        ValueError: If access_sample is not between 0 and 1
+    """
+    if not 0.0 <= access_sample <= 1.0:
+        raise ValueError(f"Access log sample must be between 0 and 1: {access_sample}")
+    stop_logging()
+    for path in (SERVER_LOG, ACCESS_LOG):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    server_file = logging.handlers.RotatingFileHandler(SERVER_LOG, maxBytes=max_bytes,
+                                                       backupCount=backups, encoding='utf-8')
+    console = logging.StreamHandler()
+    for handler in (server_file, console):
+        handler.setFormatter(formatter)
+        handler.addFilter(lambda record: record.name != access_logger.name)
+    access_file = logging.handlers.RotatingFileHandler(ACCESS_LOG, maxBytes=max_bytes,
+                                                       backupCount=backups, encoding='utf-8')
+    access_file.setFormatter(AccessFormatter())
+    access_file.addFilter(lambda record: record.name == access_logger.name)
+
+    log_queue = _ProcessQueue() if processes > 1 else queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, server_file, console, access_file,
+                                              respect_handler_level=True)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _state.update(listener=listener, queue=log_queue, pid=os.getpid(), sample=access_sample)
+    listener.start()
+
+def stop_logging() -> None:
+    """
+    Write out queued records and stop the listener
+
+    Forked workers have nothing to write out: their records are already in
+    the shared queue, and the listener runs in the process that configured it.
+    """
+    listener = _state['listener']
+    if listener is None or os.getpid() != _state['pid']:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    _state.update(listener=None, queue=None, pid=None)
+
+def log_access(method: str, route: str, path: str, status: int, sent: int, duration: float) -> None:
+    """
+    Queue an access log entry for a finished request
+
+    Only the configured fraction of requests is logged, chosen at random;
+    server errors are always logged, even with a sample of 0.
+
+    Args:
+        method: HTTP method
+        route: Name of the route that served the request (see api.route_name)
+        path: Request path without the query string
+        status: Response status code
+        sent: Response body bytes sent
+        duration: Seconds from reading the request to sending the response
+    """
+    sample = _state['sample']
+    if status < 500 and sample < 1.0 and random.random() >= sample:
+        return
+    access_logger.info('access', extra={
+        'method': method,
+        'route': route,
+        'path': path,
+        'status': int(status),
+        'bytes': sent,
+        'duration_ms': round(duration * 1000, 3)
+    })
@@ -0,0 +1,254 @@
+# =====================================================================================
+# File: EduBridge/backend/metrics.py
+# Description: Request and storage metrics in the Prometheus text format
+# Created: 2026-10-17 22:00:00
+# Last Modified: 2026-10-17 22:00:00
+# =====================================================================================
+
+import functools
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+# Upper bounds of the latency histogram buckets, in seconds
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Upper bounds of the response size histogram buckets, in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Content type of the text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class _Shard:
+    """
+    Metrics recorded by one thread
+
+    Only the owning thread writes a shard, so recording needs no lock.
+    Histograms are lists of per-bucket counts, one for +Inf, and the sum.
+    """
+
+    __slots__ = ('requests', 'durations', 'sizes', 'storage', 'started', 'finished')
+
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.durations: Dict[Tuple[str, str], List[float]] = {}
+        self.sizes: Dict[Tuple[str, str], List[float]] = {}
+        self.storage: Dict[Tuple[str, str], List[float]] = {}
+        self.started = 0
+        self.finished = 0
+
+class _ThreadMarker:
+    """Object living exactly as long as its thread's thread-local data"""
+
+# Shard of the current thread, the shards of live threads in this process,
+# and the totals of the threads that have finished
+_local = threading.local()
+_shards: List[_Shard] = []
+_retired = _Shard()
+_shards_lock = threading.Lock()
+
+def _shard() -> _Shard:
+    """Return the current thread's shard, registering it on first use"""
+    try:
+        return _local.shard
+    except AttributeError:
+        shard = _local.shard = _Shard()
+        # Thread-local data is dropped when its thread ends, which retires the shard
+        _local.marker = _ThreadMarker()
+        weakref.finalize(_local.marker, _retire, shard).atexit = False
+        with _shards_lock:
+            _shards.append(shard)
+        return shard
+
+def _add(totals: Dict[Tuple, Any], key: Tuple, value: Any) -> None:
+    """Add a counter or histogram to a total, never changing a histogram in place"""
+    total = totals.get(key)
+    if isinstance(value, list):
+        totals[key] = list(value) if total is None else [a + b for a, b in zip(total, value)]
+    else:
+        totals[key] = (total or 0) + value
+
+def _retire(shard: _Shard) -> None:
+    """Fold the shard of a finished thread into the retired totals"""
+    with _shards_lock:
+        if shard not in _shards:
+            # Dropped by a fork
+            return
+        _shards.remove(shard)
+        for attribute in ('requests', 'durations', 'sizes', 'storage'):
+            totals = getattr(_retired, attribute)
+            for key, value in getattr(shard, attribute).items():
+                _add(totals, key, value)
+        _retired.started += shard.started
+        _retired.finished += shard.finished
+
+def _reset() -> None:
+    """Start a forked worker without the metrics of its parent"""
+    global _local, _retired, _shards_lock
+    # Another thread may have held the lock at the fork
+    _shards_lock = threading.Lock()
+    _local = threading.local()
+    _shards.clear()
+    _retired = _Shard()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset)
+
+def _observe(histograms: Dict[Tuple[str, str], List[float]], key: Tuple[str, str],
+             buckets: Tuple[float, ...], value: float) -> None:
+    """Add one observation to a histogram of a shard"""
+    counts = histograms.get(key)
+    if counts is None:
+        counts = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+    counts[bisect_left(buckets, value)] += 1
+    counts[-1] += value
+
+def request_started() -> None:
+    """Count a request as in flight until request_finished() is called"""
+    _shard().started += 1
+
+def request_finished() -> None:
+    """Stop counting a request as in flight"""
+    _shard().finished += 1
+
+def record_request(method: str, route: str, status: int, sent: int, duration: float) -> None:
+    """
+    Record a served request
+
+    Args:
+        method: HTTP method
+        route: Name of the route that served the request (see api.route_name)
+        status: Response status code
+        sent: Response body bytes sent
+        duration: Seconds from reading the request to sending the response
+    """
+    shard = _shard()
+    key = (method, route)
+    request_key = (method, route, int(status))
+    shard.requests[request_key] = shard.requests.get(request_key, 0) + 1
+    _observe(shard.durations, key, DURATION_BUCKETS, duration)
+    _observe(shard.sizes, key, SIZE_BUCKETS, sent)
+
+@contextmanager
+def storage_timer(operation: str, collection: str) -> Iterator[None]:
+    """Time the enclosed storage operation on a collection"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _observe(_shard().storage, (operation, collection), DURATION_BUCKETS, time.perf_counter() - started)
+
+def collection_of(file_path: str) -> str:
+    """Name of the collection stored in a file: its name without extension, e.g. 'courses'"""
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def timed_storage(operation: str) -> Callable:
+    """Decorate a function taking a file path first, timing each call per collection"""
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(file_path: str, *args, **kwargs):
+            with storage_timer(operation, collection_of(file_path)):
+                return function(file_path, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def _merged(attribute: str) -> Dict[Tuple, Any]:
+    """Sum one metric over every shard, including those of finished threads"""
+    with _shards_lock:
+        shards = list(_shards) + [_retired]
+    merged: Dict[Tuple, Any] = {}
+    for shard in shards:
+        # A dict copy is atomic, while iterating one its owner writes to is not
+        for key, value in getattr(shard, attribute).copy().items():
+            _add(merged, key, value)
+    return merged
+
+def _labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    """Format a label set, escaping the values"""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return ','.join(pairs)
+
+def _header(lines: List[str], name: str, kind: str, description: str) -> None:
+    """Append the HELP and TYPE lines of a metric"""
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} {kind}")
+
+def _histogram(lines: List[str], name: str, description: str, label_names: Tuple[str, ...],
+               histograms: Dict[Tuple, List[float]], buckets: Tuple[float, ...]) -> None:
+    """Append a histogram, turning per-bucket counts into the cumulative counts expected"""
+    _header(lines, name, 'histogram', description)
+    for key in sorted(histograms):
+        counts = histograms[key]
+        labels = _labels(label_names, key)
+        cumulative = 0
+        for bound, count in zip(buckets + ('+Inf',), counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {round(counts[-1], 6)}')
+        lines.append(f'{name}_count{{{labels}}} {cumulative}')
+
+def _cache_metrics(lines: List[str], prefix: str, label: str, caches: Dict[str, Dict[str, Any]]) -> None:
+    """Append the hit and miss counters and the hit ratio of caches, labelled by name"""
+    for name, kind, description in (
+        ('hits', 'counter', 'Cache lookups answered from the cache'),
+        ('misses', 'counter', 'Cache lookups that missed'),
+        ('hit_ratio', 'gauge', 'Share of cache lookups answered from the cache')
+    ):
+        metric = f"{prefix}_{name}" + ('_total' if kind == 'counter' else '')
+        _header(lines, metric, kind, description)
+        for cache in sorted(caches):
+            stats = caches[cache]
+            value = stats.get(name)
+            if value is None:
+                lookups = stats['hits'] + stats['misses']
+                value = stats['hits'] / lookups if lookups else 0.0
+            lines.append(f"{metric}{{{_labels((label,), (cache,))}}} {value}")
+
+def render_metrics(caches: Dict[str, Dict[str, Any]], collections: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Render every metric in the Prometheus text exposition format
+
+    Counters cover this process only; with pre-forked workers each scrape
+    is answered by one of them.
+
+    Args:
+        caches: stats() of each cache by name, for the hit and miss counters
+        collections: stats() of each repository collection by name; those
+            counting hits and misses are in-memory caches of their files
+    """
+    lines: List[str] = []
+
+    _header(lines, 'edubridge_http_requests_total', 'counter', 'Requests served, by route and status')
+    requests = _merged('requests')
+    for key in sorted(requests):
+        lines.append(f"edubridge_http_requests_total{{{_labels(('method', 'route', 'status'), key)}}} "
+                     f"{requests[key]}")
+
+    _histogram(lines, 'edubridge_http_request_duration_seconds',
+               'Time from reading a request to sending its response',
+               ('method', 'route'), _merged('durations'), DURATION_BUCKETS)
+    _histogram(lines, 'edubridge_http_response_size_bytes', 'Response body bytes sent',
+               ('method', 'route'), _merged('sizes'), SIZE_BUCKETS)
+
+    with _shards_lock:
+        shards = list(_shards) + [_retired]
+    in_flight = sum(shard.started for shard in shards) - sum(shard.finished for shard in shards)
+    _header(lines, 'edubridge_http_requests_in_flight', 'gauge', 'Requests being served')
+    lines.append(f"edubridge_http_requests_in_flight {in_flight}")
+
+    _cache_metrics(lines, 'edubridge_cache', 'cache', caches)
+    _cache_metrics(lines, 'edubridge_collection_cache', 'collection',
+                   {name: stats for name, stats in collections.items() if 'hits' in stats})
+
+    _histogram(lines, 'edubridge_storage_duration_seconds',
+               'Time spent reading and writing stored collections, by operation and collection',
+               ('operation', 'collection'), _merged('storage'), DURATION_BUCKETS)
+
+    return '\n'.join(lines) + '\n'
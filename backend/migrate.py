@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# =====================================================================================
+# File: EduBridge/backend/migrate.py
+# Description: One-shot migration of the JSON data files into SQLite
+# Created: 2026-10-17 13:30:00
+# Last Modified: 2026-10-17 13:30:00
+# =====================================================================================
+
+import argparse
+import logging
+
+# Import our modules
+from sqlite_repository import DEFAULT_DB_NAME, migrate_json_to_sqlite
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    # Parse command line options
+    parser = argparse.ArgumentParser(description="Import courses.json, lectures.json, notes.json and quizzes.json into SQLite")
+    parser.add_argument('--data-dir', default='backend/data', help="Directory holding the JSON files")
+    parser.add_argument('--db-name', default=DEFAULT_DB_NAME, help="Database file name inside the data directory")
+    args = parser.parse_args()
+    
+    counts = migrate_json_to_sqlite(args.data_dir, args.db_name)
+    logger.info(f"Migration complete: {counts}")
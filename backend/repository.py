@@ -0,0 +1,1024 @@
+# =====================================================================================
+# File: EduBridge/backend/repository.py
+# Description: Shared data layer for EduBridge collections
+# Created: 2026-10-17 09:00:00
+# Last Modified: 2026-10-17 09:00:00
+# =====================================================================================
+
+import os
+import logging
+import secrets
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# Import our modules
+from storage import STORAGE_CLASSES, DEFAULT_COMMIT_WINDOW, FileLock, GroupCommitWriter, put_mutation
+from utils import load_json_data, save_json_data
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Collections stored by the backend, one JSON file each
+COLLECTION_NAMES = ('courses', 'lectures', 'notes', 'quizzes')
+
+# Secondary indexes maintained per collection, as tuples of indexed fields
+SECONDARY_INDEXES = {
+    'courses': (('category',),),
+    'lectures': (('course_id',),),
+    'notes': (('course_id',), ('lecture_id',), ('course_id', 'lecture_id')),
+    'quizzes': (('course_id',), ('lecture_id',), ('course_id', 'lecture_id'))
+}
+
+# Fields filtered case-insensitively; their values are compared casefolded
+FOLDED_FIELDS = ('category',)
+
+# Orderings kept sorted for keyset pagination: name -> field, with the id breaking ties
+ORDERINGS = {
+    'created': 'created_at',
+    'title': 'title'
+}
+
+# Storage modes selectable at startup: file strategies plus the SQLite backend
+STORAGE_MODES = tuple(STORAGE_CLASSES) + ('sqlite',)
+
+# Sentinel stamp meaning "never loaded / must reload on next access"
+_STALE = object()
+
+# File in the data directory holding the change sequence of shared repositories
+CHANGE_SEQUENCE_FILE = 'change_sequence.json'
+
+# Changes a tombstone is kept for after its delete; syncs starting further
+# back may have missed deletes and must start over
+DEFAULT_TOMBSTONE_RETENTION = 100000
+
+class Repository:
+    """
+    Data layer interface used by APIHandler
+
+    A repository hands out one collection object per collection name. Every
+    backend's collections provide the same methods as Collection below:
+    all(), get(), find(), page(), changes(), insert(), update(), delete(),
+    apply(), version(), item_version(), stats() and close().
+
+    Every change is numbered from one sequence shared by all collections.
+    Records carry the number of their last change as 'change_seq' and
+    deletes leave a tombstone, {'id': ..., 'deleted': True, 'change_seq': ...},
+    which changes() returns but no other read does. Tombstones are pruned
+    once the tombstone retention of changes has been made after them.
+    """
+
+    def collection(self, name: str) -> Any:
+        """Get a collection by name"""
+        raise NotImplementedError
+
+    def last_change(self) -> int:
+        """
+        Return the number of the latest change to any collection
+
+        Every change numbered up to the returned value is visible to reads
+        made after this call.
+        """
+        raise NotImplementedError
+
+    def sync_horizon(self) -> int:
+        """
+        Return the oldest change number a sync can continue from
+
+        Tombstones numbered up to the horizon may have been pruned, so
+        changes() no longer shows every delete made after an older number.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Flush pending writes and release resources"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return statistics for every collection"""
+        raise NotImplementedError
+
+class ChangeSequence:
+    """
+    Counter numbering the changes of every collection of a repository
+
+    A collection takes a number while holding its lock and applies the
+    change before releasing it. A reader that calls current() and then
+    takes each collection's lock in turn therefore sees every change
+    numbered up to the value it got.
+
+    The counter starts after the highest number found in the collections.
+    With a path it is also kept in that file, under an inter-process lock,
+    so server processes sharing a data directory share the sequence.
+    """
+
+    def __init__(self, stored: Callable[[], int], path: Optional[str] = None):
+        """
+        Initialize sequence
+
+        Args:
+            stored: Returns the highest number stored in the collections
+            path: File keeping the sequence for several processes, or None
+        """
+        self.path = path
+        self._stored = stored
+        self._lock = FileLock(path + '.lock') if path else threading.Lock()
+        self._value: Optional[int] = None
+
+    def start(self) -> None:
+        """Find where the sequence stands; call without holding a collection lock"""
+        if self._value is None:
+            # Loads every collection, so it must not run under a collection's lock
+            stored = self._stored()
+            with self._lock:
+                self._value = max(self._value or 0, stored)
+
+    def observe(self, value: int) -> None:
+        """Move the counter past a number found in reloaded data"""
+        with self._lock:
+            if self._value is not None and value > self._value:
+                self._value = value
+
+    def next(self) -> int:
+        """Take the next number; call with the changed collection's lock held"""
+        with self._lock:
+            value = max(self._value or 0, self._read()) + 1
+            if self.path:
+                save_json_data(self.path, {'value': value})
+            self._value = value
+            return value
+
+    def current(self) -> int:
+        """Return the latest number taken"""
+        self.start()
+        with self._lock:
+            return max(self._value, self._read())
+
+    def _read(self) -> int:
+        """Return the number stored by other processes, 0 if not shared"""
+        if not self.path:
+            return 0
+        return load_json_data(self.path).get('value', 0)
+
+class Collection:
+    """In-memory copy of one collection with write-through persistence"""
+
+    def __init__(self, name: str, storage: Any, indexes: Tuple[Tuple[str, ...], ...] = (),
+                 fsync: str = 'batched', commit_window: float = DEFAULT_COMMIT_WINDOW,
+                 shared: bool = False, sequence: Optional[ChangeSequence] = None,
+                 tombstone_retention: int = DEFAULT_TOMBSTONE_RETENTION):
+        """
+        Initialize collection
+
+        Args:
+            name: Collection name (e.g. 'courses')
+            storage: Storage strategy persisting the collection (see storage.py)
+            indexes: Field tuples to maintain secondary indexes on
+            fsync: Fsync policy of the collection's writer
+            commit_window: Seconds the writer gathers mutations into one commit
+            shared: Whether other processes write the same storage; mutations
+                then commit synchronously under an inter-process file lock
+            sequence: Sequence numbering the changes, shared with the other
+                collections of the repository; by default the collection's own
+            tombstone_retention: Changes a tombstone is kept for after its delete
+        """
+        self.name = name
+        self.tombstone_retention = tombstone_retention
+        self.storage = storage
+        self.fsync = fsync
+        self.shared = shared
+        self._lock = threading.RLock()
+        self._compaction: Optional[threading.Thread] = None
+        # Shared collections commit synchronously and need no writer thread
+        self._writer = None if shared else GroupCommitWriter(name, self._commit, fsync, commit_window)
+        # Mutations applied in memory but not yet committed by the writer
+        self._pending = 0
+        # Primary key index: id -> record, kept in file order
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        # Secondary indexes: fields -> field values -> ids (dict used as ordered set)
+        self._indexes: Dict[Tuple[str, ...], Dict[Tuple[Any, ...], Dict[str, None]]] = {
+            fields: {} for fields in indexes
+        }
+        # Orderings: name -> sorted (field value, id) keys
+        self._orderings: Dict[str, List[Tuple[str, str]]] = {name: [] for name in ORDERINGS}
+        # The same orderings per secondary index bucket, so filtered pages
+        # walk only matching records: fields -> field values -> name -> keys
+        self._bucket_orderings: Dict[Tuple[str, ...], Dict[Tuple[Any, ...], Dict[str, List[Tuple[str, str]]]]] = {
+            fields: {} for fields in indexes
+        }
+        # Tombstones of deleted records by id, in change order, and
+        # (change_seq, id) keys of records and tombstones sorted in change order
+        self._tombstones: Dict[str, Dict[str, Any]] = {}
+        self._changes: List[Tuple[int, str]] = []
+        self._sequence = sequence or ChangeSequence(self.last_change)
+        self._stamp: Any = _STALE
+        # Version tags: a random epoch per load plus a counter bumped by every
+        # change, so tags never repeat across reloads or processes
+        self._epoch = ''
+        self._version = 0
+        self._modified = 0.0
+        self._loaded_at = 0.0
+        # id -> (version, time) of the record's last change since the load
+        self._item_versions: Dict[str, Tuple[int, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _ensure_loaded(self) -> None:
+        """Reload the collection if its stored data changed since it was cached"""
+        stamp = self.storage.stamp()
+        # While our own commits are in flight the stamp is expected to move,
+        # and reloading would drop mutations the writer has not stored yet
+        if stamp == self._stamp or self._pending:
+            self.hits += 1
+            return
+
+        self.misses += 1
+        self._index(self.storage.load())
+        self._stamp = stamp
+        self._epoch = secrets.token_hex(4)
+        self._version = 0
+        self._loaded_at = self._modified = time.time()
+        self._item_versions = {}
+        logger.debug(f"Loaded {len(self._by_id)} records into '{self.name}' cache")
+
+    def _index(self, records: List[Dict[str, Any]]) -> None:
+        """Rebuild the in-memory indexes from a list of records"""
+        self._by_id = {}
+        self._tombstones = {}
+        for index in self._indexes.values():
+            index.clear()
+        for buckets in self._bucket_orderings.values():
+            buckets.clear()
+        for keys in self._orderings.values():
+            keys.clear()
+        tombstones = []
+        for position, record in enumerate(records):
+            record_id = record.get('id')
+            if record.get('deleted') is True and record_id is not None:
+                tombstones.append(record)
+                continue
+            if record_id is None or record_id in self._by_id:
+                # Keep malformed or duplicate rows so they survive the next save
+                logger.warning(f"Record at position {position} in '{self.name}' has a missing or duplicate id")
+                record_id = f'__row_{position}'
+            self._by_id[record_id] = record
+            self._add_to_indexes(record_id, record, ordered=False)
+        for tombstone in sorted(tombstones, key=_change_seq):
+            self._tombstones.pop(tombstone['id'], None)
+            self._tombstones[tombstone['id']] = tombstone
+        for keys in self._orderings.values():
+            keys.sort()
+        for buckets in self._bucket_orderings.values():
+            for orderings in buckets.values():
+                for keys in orderings.values():
+                    keys.sort()
+        self._changes = sorted(
+            (_change_seq(record), record_id)
+            for records_by_id in (self._by_id, self._tombstones)
+            for record_id, record in records_by_id.items()
+        )
+        if self._changes:
+            self._sequence.observe(self._changes[-1][0])
+            self._prune_tombstones(self._changes[-1][0] - self.tombstone_retention)
+
+    def _add_to_indexes(self, record_id: str, record: Dict[str, Any], ordered: bool = True) -> None:
+        """Add a record to every secondary index and ordering; unordered appends leave sorting to the caller"""
+        orderings = [self._orderings]
+        for fields, index in self._indexes.items():
+            key = tuple(normalize_filter_value(field, record.get(field)) for field in fields)
+            index.setdefault(key, {})[record_id] = None
+            buckets = self._bucket_orderings[fields]
+            if key not in buckets:
+                buckets[key] = {name: [] for name in ORDERINGS}
+            orderings.append(buckets[key])
+        for name, field in ORDERINGS.items():
+            key = _order_key(record, field, record_id)
+            for keys in (ordering[name] for ordering in orderings):
+                if ordered:
+                    insort(keys, key)
+                else:
+                    keys.append(key)
+
+    def _remove_from_indexes(self, record_id: str, record: Dict[str, Any]) -> None:
+        """Remove a record from every secondary index and ordering"""
+        orderings = [self._orderings]
+        for fields, index in self._indexes.items():
+            key = tuple(normalize_filter_value(field, record.get(field)) for field in fields)
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(record_id, None)
+                orderings.append(self._bucket_orderings[fields][key])
+                if not bucket:
+                    del index[key]
+                    del self._bucket_orderings[fields][key]
+        for name, field in ORDERINGS.items():
+            key = _order_key(record, field, record_id)
+            for keys in (ordering[name] for ordering in orderings):
+                position = bisect_left(keys, key)
+                if position < len(keys) and keys[position] == key:
+                    del keys[position]
+
+    def _record_change(self, record_id: str, previous: Optional[Dict[str, Any]],
+                       current: Dict[str, Any]) -> None:
+        """Move a record from its previous place in change order to its current one"""
+        if previous is not None:
+            key = (_change_seq(previous), record_id)
+            position = bisect_left(self._changes, key)
+            if position < len(self._changes) and self._changes[position] == key:
+                del self._changes[position]
+        insort(self._changes, (_change_seq(current), record_id))
+        # Storage drops pruned tombstones with the next snapshot it writes
+        self._prune_tombstones(_change_seq(current) - self.tombstone_retention)
+
+    def _prune_tombstones(self, horizon: int) -> None:
+        """Drop the tombstones numbered up to a horizon; call with the lock held"""
+        pruned = []
+        for record_id, tombstone in self._tombstones.items():
+            if _change_seq(tombstone) > horizon:
+                break
+            pruned.append(record_id)
+        for record_id in pruned:
+            key = (_change_seq(self._tombstones.pop(record_id)), record_id)
+            position = bisect_left(self._changes, key)
+            if position < len(self._changes) and self._changes[position] == key:
+                del self._changes[position]
+
+    def _touch(self, record_id: str) -> None:
+        """Bump the collection's and a record's version; call with the lock held"""
+        self._version += 1
+        self._modified = time.time()
+        self._item_versions[record_id] = (self._version, self._modified)
+
+    def _persist(self, mutations: List[Dict[str, Any]]) -> Future:
+        """Queue mutations of the cached records for one commit by the writer; call with the lock held"""
+        self._pending += len(mutations)
+        return self._writer.submit_many(mutations)
+
+    def _commit(self, mutations: List[Dict[str, Any]], fsync: bool) -> bool:
+        """Write a batch of mutations through to storage (runs on the writer thread)"""
+        committed = self.storage.commit(mutations, self._snapshot, fsync)
+        with self._lock:
+            self._pending -= len(mutations)
+            # On failure storage and memory may disagree, reload on next access
+            self._stamp = self.storage.stamp() if committed else _STALE
+        if committed and self.storage.needs_compaction():
+            self._start_compaction()
+        return committed
+
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        """Return a consistent copy of the records list, tombstones included"""
+        with self._lock:
+            # Records are replaced, never mutated, so a shallow copy is stable
+            return list(self._by_id.values()) + list(self._tombstones.values())
+
+    def _start_compaction(self) -> None:
+        """Fold the journal into the snapshot on a background thread"""
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        self._compaction = threading.Thread(
+            target=self._compact, name=f'compact-{self.name}', daemon=True
+        )
+        self._compaction.start()
+
+    def _compact(self) -> None:
+        """Compact storage without blocking readers and writers while writing"""
+        try:
+            # Between processes, compaction excludes writers for its whole duration
+            with self.storage.lock if self.shared else nullcontext():
+                with self._lock:
+                    if self.shared:
+                        self._ensure_loaded()
+                        if not self.storage.needs_compaction():
+                            # Another process compacted first
+                            return
+                    records = self._snapshot()
+                    self.storage.begin_compaction()
+                compacted = self.storage.finish_compaction(records)
+                with self._lock:
+                    if self._stamp is not _STALE:
+                        self._stamp = self.storage.stamp()
+            if compacted:
+                logger.info(f"Compacted '{self.name}' journal into snapshot ({len(records)} records)")
+        except Exception as e:
+            logger.error(f"Error compacting '{self.name}': {e}", exc_info=True)
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return all records in insertion order"""
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._by_id.values())
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Return the record with the given ID, or None"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._by_id.get(record_id)
+
+    def version(self) -> Tuple[str, float]:
+        """Return a tag that changes whenever the collection changes, and the time it last changed"""
+        with self._lock:
+            self._ensure_loaded()
+            return f'{self._epoch}.{self._version}', self._modified
+
+    def item_version(self, record_id: str) -> Optional[Tuple[str, float]]:
+        """Return the version tag and last change time of a record, or None if it does not exist"""
+        with self._lock:
+            self._ensure_loaded()
+            if record_id not in self._by_id:
+                return None
+            version, modified = self._item_versions.get(record_id, (0, self._loaded_at))
+            return f'{self._epoch}.{version}', modified
+
+    def find(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Return records whose fields equal the given filter values
+
+        Filters with empty values are ignored, FOLDED_FIELDS compare
+        case-insensitively. When a secondary index covers the filtered fields
+        the cost is proportional to the result size.
+        """
+        filters = _normalized_filters(filters)
+        if not filters:
+            return self.all()
+
+        with self._lock:
+            self._ensure_loaded()
+            fields = tuple(sorted(filters))
+            index = self._indexes.get(fields)
+            if index is not None:
+                ids = index.get(tuple(filters[field] for field in fields), {})
+                return [self._by_id[record_id] for record_id in ids]
+
+            # No exact index: narrow down with a single-field index if possible
+            candidates = self._by_id.values()
+            for field in fields:
+                index = self._indexes.get((field,))
+                if index is not None:
+                    ids = index.get((filters[field],), {})
+                    candidates = [self._by_id[record_id] for record_id in ids]
+                    break
+            return [r for r in candidates
+                    if all(normalize_filter_value(f, r.get(f)) == v for f, v in filters.items())]
+
+    def page(self, ordering: str, after: Optional[Tuple[str, str]] = None, limit: int = 20,
+             filters: Optional[Dict[str, Any]] = None,
+             descending: bool = False) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        """
+        Return the records following a position in one of the ORDERINGS
+
+        Positions are (field value, id) keys rather than offsets, so a page
+        costs the records it walks instead of everything before it, and
+        records inserted before the position do not shift later pages.
+        Filtered pages walk the ordering of a secondary index bucket: only
+        matching records when an index covers the filtered fields, the
+        records of the smallest single-field bucket otherwise.
+
+        Args:
+            ordering: Name of the ordering in ORDERINGS
+            after: Key of the last record of the previous page, None for the first page
+            limit: Most records to return
+            filters: Fields whose values must match; FOLDED_FIELDS compare case-insensitively
+            descending: Walk the ordering backwards
+
+        Returns:
+            (records, key of the last record or None if there are no more)
+        """
+        matches = _filter_matcher(filters)
+        with self._lock:
+            self._ensure_loaded()
+            keys = self._ordering_keys(ordering, _normalized_filters(filters))
+            if descending:
+                position = (bisect_left(keys, after) if after is not None else len(keys)) - 1
+                step = -1
+            else:
+                position = bisect_right(keys, after) if after is not None else 0
+                step = 1
+            # One record beyond the page tells whether another page follows
+            found: List[Tuple[Tuple[str, str], Dict[str, Any]]] = []
+            while 0 <= position < len(keys) and len(found) <= limit:
+                record = self._by_id[keys[position][1]]
+                if matches(record):
+                    found.append((keys[position], record))
+                position += step
+        more = len(found) > limit
+        found = found[:limit]
+        return [record for _, record in found], (found[-1][0] if more else None)
+
+    def _ordering_keys(self, ordering: str, filters: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """Sorted keys of the narrowest ordering holding every record matching normalized filters"""
+        fields = tuple(sorted(filters))
+        if not fields:
+            return self._orderings[ordering]
+        empty = {name: [] for name in ORDERINGS}
+        buckets = self._bucket_orderings.get(fields)
+        if buckets is not None:
+            return buckets.get(tuple(filters[field] for field in fields), empty)[ordering]
+        narrowest = self._orderings[ordering]
+        for field in fields:
+            buckets = self._bucket_orderings.get((field,))
+            if buckets is not None:
+                keys = buckets.get((filters[field],), empty)[ordering]
+                if len(keys) < len(narrowest):
+                    narrowest = keys
+        return narrowest
+
+    def changes(self, after: Tuple[int, str], until: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Return records and tombstones in change order, from a position on
+
+        Args:
+            after: (change_seq, id) the walk starts after; ids are never
+                empty, so (n, '') starts with the changes numbered n
+            until: Highest change number returned
+            limit: Most records returned
+
+        Returns:
+            Records and tombstones ordered by (change_seq, id)
+        """
+        # Between processes, wait for writers that may hold numbers up to until
+        with self.storage.lock if self.shared else nullcontext():
+            with self._lock:
+                self._ensure_loaded()
+                position = bisect_right(self._changes, after)
+                found = []
+                while position < len(self._changes) and len(found) < limit:
+                    change_seq, record_id = self._changes[position]
+                    if change_seq > until:
+                        break
+                    found.append(self._by_id.get(record_id) or self._tombstones[record_id])
+                    position += 1
+                return found
+
+    def last_change(self) -> int:
+        """Return the highest change number stored in the collection"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._changes[-1][0] if self._changes else 0
+
+    def insert(self, record: Dict[str, Any]) -> bool:
+        """Append a record and write it through to storage"""
+        return self.apply([('insert', record)])[0]
+
+    def update(self, record_id: str, changes: Dict[str, Any]) -> bool:
+        """
+        Apply changes to a record and write it through to storage
+
+        Records are replaced rather than mutated so references handed out
+        by all()/get() never change underneath their holders.
+        """
+        return self.apply([('update', record_id, changes)])[0]
+
+    def delete(self, record_id: str) -> bool:
+        """Remove a record and write the change through to storage"""
+        return self.apply([('delete', record_id)])[0]
+
+    def apply(self, changes: List[Tuple[Any, ...]]) -> List[bool]:
+        """
+        Apply several inserts, updates and deletes and commit them in one write
+
+        Args:
+            changes: ('insert', record), ('update', record_id, changes) or
+                ('delete', record_id) tuples, applied in order
+
+        Returns:
+            Whether each change was applied and committed; updates and
+            deletes of missing records are skipped
+        """
+        functions = {'insert': self._insert, 'update': self._update, 'delete': self._delete}
+        unknown = [change[0] for change in changes if change[0] not in functions]
+        if unknown:
+            raise ValueError(f"Unknown change type: {', '.join(unknown)}")
+
+        applied: List[bool] = []
+
+        def change():
+            mutations = []
+            for kind, *args in changes:
+                mutation = functions[kind](*args)
+                applied.append(mutation is not None)
+                if mutation is not None:
+                    mutations.append(mutation)
+            return mutations
+        committed = self._apply(change)
+        return [ok and committed for ok in applied]
+
+    def _insert(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Add a record in memory and return its mutation; call with the lock held"""
+        record['change_seq'] = self._sequence.next()
+        previous = self._by_id.get(record['id'])
+        if previous is not None:
+            # Inserting an existing id replaces the record
+            self._remove_from_indexes(record['id'], previous)
+        else:
+            previous = self._tombstones.pop(record['id'], None)
+        self._by_id[record['id']] = record
+        self._add_to_indexes(record['id'], record)
+        self._record_change(record['id'], previous, record)
+        self._touch(record['id'])
+        return put_mutation(record)
+
+    def _update(self, record_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Replace a record in memory and return its mutation, or None if it does not exist"""
+        record = self._by_id.get(record_id)
+        if record is None:
+            return None
+
+        updated = dict(record)
+        updated.update(changes)
+        updated['change_seq'] = self._sequence.next()
+        # Assigning to an existing key keeps the record's position
+        self._by_id[record_id] = updated
+        self._remove_from_indexes(record_id, record)
+        self._add_to_indexes(record_id, updated)
+        self._record_change(record_id, record, updated)
+        self._touch(record_id)
+        return put_mutation(updated)
+
+    def _delete(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Replace a record with its tombstone and return the mutation, or None if it does not exist"""
+        record = self._by_id.pop(record_id, None)
+        if record is None:
+            return None
+        tombstone = {'id': record_id, 'deleted': True, 'change_seq': self._sequence.next()}
+        self._tombstones[record_id] = tombstone
+        self._remove_from_indexes(record_id, record)
+        self._record_change(record_id, record, tombstone)
+        self._touch(record_id)
+        self._item_versions.pop(record_id, None)
+        return put_mutation(tombstone)
+
+    def _apply(self, change: Callable[[], List[Dict[str, Any]]]) -> bool:
+        """
+        Apply in-memory changes and persist the mutations they return
+
+        change() runs with the collection lock held and returns the mutations
+        to persist, empty if there was nothing to change.
+        """
+        self._sequence.start()
+        if self.shared:
+            # Other processes write the same files: take the inter-process
+            # lock, catch up with their commits, then commit synchronously
+            with self.storage.lock, self._lock:
+                self._ensure_loaded()
+                mutations = change()
+                if not mutations:
+                    return False
+                committed = self.storage.commit(mutations, self._snapshot, self.fsync != 'os')
+                self._stamp = self.storage.stamp() if committed else _STALE
+            if committed and self.storage.needs_compaction():
+                self._start_compaction()
+            return committed
+
+        with self._lock:
+            self._ensure_loaded()
+            mutations = change()
+            if not mutations:
+                return False
+            pending = self._persist(mutations)
+        # Wait for the commit without holding the lock so others can join it
+        return pending.result()
+
+    def close(self) -> None:
+        """Commit queued mutations and stop the collection's writer"""
+        if self._writer is not None:
+            self._writer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics for this collection"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'records': len(self._by_id),
+            'tombstones': len(self._tombstones)
+        }
+
+class StagedCollection:
+    """
+    Write-staging view of a collection
+
+    get() sees the staged changes, inserts, updates and deletes are only
+    recorded. StagedRepository.commit() applies them with one apply() call.
+    """
+
+    def __init__(self, collection: Any, staging: 'StagedRepository'):
+        """
+        Initialize view
+
+        Args:
+            collection: Collection the changes are staged for
+            staging: Repository that tracks which operation is being staged
+        """
+        self.collection = collection
+        self.staging = staging
+        # (operation, change) pairs in staging order
+        self.changes: List[Tuple[Any, Tuple[Any, ...]]] = []
+        # id -> staged record, None once deleted
+        self._records: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Return the record with the given ID as it is after the staged changes, or None"""
+        if record_id in self._records:
+            return self._records[record_id]
+        return self.collection.get(record_id)
+
+    def insert(self, record: Dict[str, Any]) -> bool:
+        """Stage an insert"""
+        self._records[record['id']] = record
+        self._stage(('insert', record))
+        return True
+
+    def update(self, record_id: str, changes: Dict[str, Any]) -> bool:
+        """Stage an update, returning False if the record does not exist"""
+        record = self.get(record_id)
+        if record is None:
+            return False
+        self._records[record_id] = {**record, **changes}
+        self._stage(('update', record_id, changes))
+        return True
+
+    def delete(self, record_id: str) -> bool:
+        """Stage a delete, returning False if the record does not exist"""
+        if self.get(record_id) is None:
+            return False
+        self._records[record_id] = None
+        self._stage(('delete', record_id))
+        return True
+
+    def _stage(self, change: Tuple[Any, ...]) -> None:
+        """Record a change for the operation currently being staged"""
+        self.changes.append((self.staging.operation, change))
+
+class StagedRepository(Repository):
+    """
+    Staging area collecting the writes of a batch of operations
+
+    Collections are StagedCollection views. Set ``operation`` before
+    staging each operation's writes; commit() reports the operations whose
+    writes failed, and committed_record() returns what the others wrote.
+    """
+
+    def __init__(self, repository: Repository):
+        """Initialize staging area over the repository the writes are meant for"""
+        self.repository = repository
+        self.operation: Any = None
+        # Whether the last failed atomic commit undid what it had written
+        self.rolled_back = True
+        self._collections: Dict[str, StagedCollection] = {}
+        # (operation, id) -> collection of each record inserted or updated
+        self._written: Dict[Tuple[Any, str], Any] = {}
+
+    def collection(self, name: str) -> StagedCollection:
+        """Get the staging view of a collection"""
+        if name not in self._collections:
+            self._collections[name] = StagedCollection(self.repository.collection(name), self)
+        return self._collections[name]
+
+    def last_change(self) -> int:
+        """Return the latest change number of the underlying repository"""
+        return self.repository.last_change()
+
+    def touched(self) -> List[str]:
+        """Return the names of the collections with staged changes"""
+        return [name for name, collection in self._collections.items() if collection.changes]
+
+    def commit(self, atomic: bool = False) -> Set[Any]:
+        """
+        Apply the staged changes with one apply() call per collection
+
+        Each apply() commits or fails as a whole, but collections commit one
+        after another. When atomic, the first collection that fails stops
+        the commit and the collections already committed are restored to
+        the records they held before; ``rolled_back`` tells whether that
+        worked. Writes other clients made to the same records in between
+        are overwritten by the restore.
+
+        Args:
+            atomic: Whether a failure must undo the whole batch
+
+        Returns:
+            The operations that had a change that did not apply; every
+            staged operation when an atomic commit failed
+        """
+        failed: Set[Any] = set()
+        # Collections committed so far, with the records they held before
+        committed: List[Tuple[Any, Dict[str, Optional[Dict[str, Any]]]]] = []
+        for collection in self._collections.values():
+            if not collection.changes:
+                continue
+            previous = {}
+            if atomic:
+                for _, change in collection.changes:
+                    record_id = change[1]['id'] if change[0] == 'insert' else change[1]
+                    if record_id not in previous:
+                        previous[record_id] = collection.collection.get(record_id)
+            applied = collection.collection.apply([change for _, change in collection.changes])
+            if atomic and not all(applied):
+                self.rolled_back = all(self._restore(*undo) for undo in committed)
+                self._written.clear()
+                return {operation for staged in self._collections.values() for operation, _ in staged.changes}
+            committed.append((collection.collection, previous))
+            for (operation, change), ok in zip(collection.changes, applied):
+                if not ok:
+                    failed.add(operation)
+                elif change[0] in ('insert', 'update'):
+                    record_id = change[1]['id'] if change[0] == 'insert' else change[1]
+                    self._written[(operation, record_id)] = collection.collection
+        return failed
+
+    @staticmethod
+    def _restore(collection: Any, previous: Dict[str, Optional[Dict[str, Any]]]) -> bool:
+        """Put records back as they were before a commit, returning whether it worked"""
+        changes: List[Tuple[Any, ...]] = []
+        expected: List[bool] = []
+        for record_id, record in previous.items():
+            # Deleting first turns the restore into a plain insert
+            changes.append(('delete', record_id))
+            expected.append(collection.get(record_id) is not None)
+            if record is not None:
+                changes.append(('insert', dict(record)))
+                expected.append(True)
+        applied = collection.apply(changes)
+        if applied == expected:
+            return True
+        logger.error(f"Could not restore '{collection.name}' after a failed atomic batch")
+        return False
+
+    def committed_record(self, operation: Any, record_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a record an operation inserted or updated, as committed
+
+        Staged records predate the commit, so they lack the change number
+        and any later changes of the batch that the stored record has.
+        Returns None if the operation did not write the record.
+        """
+        collection = self._written.get((operation, record_id))
+        return None if collection is None else collection.get(record_id)
+
+    def close(self) -> None:
+        """Discard the staged changes"""
+        self._collections.clear()
+        self._written.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the number of staged changes per collection"""
+        return {name: {'changes': len(c.changes)} for name, c in self._collections.items()}
+
+def _change_seq(record: Dict[str, Any]) -> int:
+    """Number of a record's last change; records stored before changes were numbered count as 0"""
+    return record.get('change_seq') or 0
+
+def _order_key(record: Dict[str, Any], field: str, record_id: str) -> Tuple[str, str]:
+    """Key of a record in an ordering; missing values sort first"""
+    value = record.get(field)
+    return ('' if value is None else str(value), record_id)
+
+def normalize_filter_value(field: str, value: Any) -> Any:
+    """Return the form a field's value is filtered and indexed by: casefolded for FOLDED_FIELDS"""
+    if field in FOLDED_FIELDS and isinstance(value, str):
+        return value.casefold()
+    return value
+
+def _normalized_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Drop filters with empty values and normalize the others"""
+    return {
+        field: normalize_filter_value(field, value)
+        for field, value in (filters or {}).items() if value
+    }
+
+def _filter_matcher(filters: Optional[Dict[str, Any]]) -> Callable[[Dict[str, Any]], bool]:
+    """Build a predicate for page() filters, ignoring empty values"""
+    wanted = _normalized_filters(filters)
+
+    def matches(record: Dict[str, Any]) -> bool:
+        for field, value in wanted.items():
+            if normalize_filter_value(field, record.get(field)) != value:
+                return False
+        return True
+    return matches
+
+def iter_batches(collection: Any, filters: Optional[Dict[str, Any]] = None,
+                 batch_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Walk a collection in creation order, one batch of records at a time
+
+    Batches are fetched with page(), so only one batch is held in memory and
+    no lock is kept between batches. Records written during the walk may or
+    may not be included.
+
+    Args:
+        collection: Collection of any backend
+        filters: Fields whose values must match, as for page()
+        batch_size: Most records in one batch
+    """
+    after = None
+    while True:
+        records, after = collection.page('created', after, batch_size, filters)
+        if records:
+            yield records
+        if after is None:
+            return
+
+class JSONRepository(Repository):
+    """Repository of file-backed collections kept parsed in memory"""
+
+    def __init__(self, data_dir: str = 'backend/data', storage: str = 'snapshot',
+                 fsync: str = 'batched', commit_window: float = DEFAULT_COMMIT_WINDOW,
+                 shared: bool = False, tombstone_retention: int = DEFAULT_TOMBSTONE_RETENTION):
+        """
+        Initialize repository for the given data directory
+
+        Args:
+            data_dir: Directory holding the collection files
+            storage: 'snapshot' to rewrite each JSON file on every change, or
+                'journal' to append changes to a per-collection journal
+            fsync: Fsync policy for commits ('always', 'batched' or 'os')
+            commit_window: Seconds each writer gathers mutations into one commit
+            shared: Whether several server processes use the data directory
+            tombstone_retention: Changes a tombstone is kept for after its delete
+        """
+        if storage not in STORAGE_CLASSES:
+            raise ValueError(f"Unknown storage mode: {storage}")
+        self.data_dir = data_dir
+        self.storage = storage
+        self.tombstone_retention = tombstone_retention
+        storage_class = STORAGE_CLASSES[storage]
+        self._sequence = ChangeSequence(
+            lambda: max(collection.last_change() for collection in self._collections.values()),
+            os.path.join(data_dir, CHANGE_SEQUENCE_FILE) if shared else None
+        )
+        self._collections = {
+            name: Collection(
+                name,
+                storage_class(os.path.join(data_dir, f'{name}.json')),
+                SECONDARY_INDEXES[name],
+                fsync,
+                commit_window,
+                shared,
+                self._sequence,
+                tombstone_retention
+            )
+            for name in COLLECTION_NAMES
+        }
+
+    def collection(self, name: str) -> Collection:
+        """Get a collection by name"""
+        return self._collections[name]
+
+    def last_change(self) -> int:
+        """Return the number of the latest change to any collection"""
+        return self._sequence.current()
+
+    def sync_horizon(self) -> int:
+        """Return the oldest change number a sync can continue from"""
+        return max(0, self.last_change() - self.tombstone_retention)
+
+    def close(self) -> None:
+        """Flush pending writes of every collection"""
+        for collection in self._collections.values():
+            collection.close()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return cache statistics for every collection"""
+        return {name: c.stats() for name, c in self._collections.items()}
+
+# Repositories shared by every APIHandler, keyed by data directory
+_repositories: Dict[str, Repository] = {}
+_repositories_lock = threading.Lock()
+
+def configure_repository(data_dir: str = 'backend/data', storage: str = 'snapshot',
+                         fsync: str = 'batched', commit_window: float = DEFAULT_COMMIT_WINDOW,
+                         shared: bool = False,
+                         tombstone_retention: int = DEFAULT_TOMBSTONE_RETENTION) -> Repository:
+    """
+    Create the shared repository for a data directory with the given options
+
+    Pass shared=True when several server processes use the same data
+    directory. SQLite coordinates processes itself; the file storages then
+    commit every mutation under an inter-process lock.
+    """
+    if storage == 'sqlite':
+        # Imported here because the SQLite backend builds on this module
+        from sqlite_repository import SQLiteRepository
+        repository = SQLiteRepository(data_dir, fsync, tombstone_retention=tombstone_retention)
+    else:
+        repository = JSONRepository(data_dir, storage, fsync, commit_window, shared, tombstone_retention)
+
+    key = os.path.abspath(data_dir)
+    with _repositories_lock:
+        if key in _repositories:
+            _repositories[key].close()
+        _repositories[key] = repository
+    return repository
+
+def get_repository(data_dir: str = 'backend/data') -> Repository:
+    """Get the shared repository for a data directory, creating it on first use"""
+    key = os.path.abspath(data_dir)
+    with _repositories_lock:
+        if key not in _repositories:
+            _repositories[key] = JSONRepository(data_dir)
+        return _repositories[key]
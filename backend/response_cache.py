@@ -0,0 +1,172 @@
+# =====================================================================================
+# File: EduBridge/backend/response_cache.py
+# Description: LRU cache of encoded API responses
+# Created: 2026-10-17 17:00:00
+# Last Modified: 2026-10-17 17:00:00
+# =====================================================================================
+
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Default memory budget for cached response bodies
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# Rough per-entry bookkeeping cost counted against the budget
+_ENTRY_OVERHEAD = 256
+
+class CachedResponse:
+    """Encoded body of a successful GET together with the version it encodes"""
+
+    __slots__ = ('etag', 'last_modified', 'body', 'variants')
+
+    def __init__(self, etag: str, last_modified: float, body: bytes):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+        # Content coding -> compressed body, added as clients ask for them
+        self.variants: Dict[str, bytes] = {}
+
+    def size(self) -> int:
+        """Bytes this entry holds"""
+        return len(self.body) + sum(len(v) for v in self.variants.values()) + _ENTRY_OVERHEAD
+
+class ResponseCache:
+    """
+    Encoded API responses keyed by route and normalized query
+
+    Each entry records the collections it was built from. Writes through
+    APIHandler drop exactly the entries of the collection they changed.
+    Entries also carry the version tag they encode, and callers only use
+    an entry whose tag is still current, so writes made by other processes
+    never serve stale bytes either. The total size is capped; the least
+    recently used entries are evicted first.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize cache
+
+        Args:
+            max_bytes: Memory budget for cached bodies, 0 disables caching
+        """
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Hashable, Tuple[Tuple[str, ...], CachedResponse]]' = OrderedDict()
+        # Collection name -> keys of the entries built from it
+        self._by_collection: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, etag: str) -> Optional[CachedResponse]:
+        """Return the entry for key if it encodes the given version"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[1].etag != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, collections: Tuple[str, ...], entry: CachedResponse) -> None:
+        """Store an entry built from the given collections"""
+        size = entry.size()
+        # A single entry may not push everything else out
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (collections, entry)
+            for name in collections:
+                self._by_collection.setdefault(name, set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_variant(self, key: Hashable, etag: str, encoding: str) -> Optional[bytes]:
+        """Return the compressed body of an entry if it is cached for this version"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[1].etag != etag:
+                return None
+            return item[1].variants.get(encoding)
+
+    def add_variant(self, key: Hashable, etag: str, encoding: str, body: bytes) -> None:
+        """Keep a compressed body with the entry it was made from"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[1].etag != etag or encoding in item[1].variants:
+                return
+            item[1].variants[encoding] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, collection: str) -> None:
+        """Drop every entry built from a collection"""
+        with self._lock:
+            keys = self._by_collection.pop(collection, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry; call with the lock held"""
+        item = self._entries.pop(key, None)
+        if item is None:
+            return
+        collections, entry = item
+        self._bytes -= entry.size()
+        for name in collections:
+            keys = self._by_collection.get(name)
+            if keys is not None:
+                keys.discard(key)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._by_collection.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+# Shared cache, created per serving process
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def configure_response_cache(max_bytes: int = DEFAULT_MAX_BYTES) -> ResponseCache:
+    """Create the shared response cache, replacing any previous one"""
+    global _response_cache
+    with _response_cache_lock:
+        _response_cache = ResponseCache(max_bytes)
+        return _response_cache
+
+def get_response_cache() -> ResponseCache:
+    """Get the shared response cache, creating it on first use"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
@@ -0,0 +1,110 @@
+# =====================================================================================
+# File: EduBridge/backend/router.py
+# Description: Path pattern router for EduBridge API endpoints
+# Created: 2026-10-17 18:00:00
+# Last Modified: 2026-10-17 18:00:00
+# =====================================================================================
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Converters for typed path parameters, e.g. {page:int}
+CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    'str': str,
+    'int': int
+}
+
+class _Node:
+    """One path segment position in the routing tree"""
+
+    __slots__ = ('static', 'param', 'targets')
+
+    def __init__(self):
+        # Literal segment -> child node
+        self.static: Dict[str, '_Node'] = {}
+        # Parameter segment: (name, converter, child node)
+        self.param: Optional[Tuple[str, Callable[[str], Any], '_Node']] = None
+        # HTTP method -> route target
+        self.targets: Dict[str, Any] = {}
+
+class Router:
+    """
+    Maps an HTTP method and path to a route target
+
+    Patterns such as ``/courses/{course_id}`` or ``/items/{page:int}`` are
+    compiled into a tree of path segments when they are added, so matching
+    a request walks the path once. Literal segments take precedence over
+    parameters, and a segment must match whole: ``/coursesXYZ`` does not
+    match ``/courses``.
+    """
+
+    def __init__(self):
+        """Initialize an empty router"""
+        self._root = _Node()
+
+    def add(self, method: str, pattern: str, target: Any) -> None:
+        """
+        Register a route
+
+        Args:
+            method: HTTP method, e.g. 'GET'
+            pattern: Path pattern; {name} or {name:type} segments are parameters
+            target: Value returned by match() for this route
+        """
+        node = self._root
+        for segment in _segments(pattern):
+            if segment.startswith('{') and segment.endswith('}'):
+                name, _, type_name = segment[1:-1].partition(':')
+                converter = CONVERTERS[type_name or 'str']
+                if node.param is None:
+                    node.param = (name, converter, _Node())
+                elif node.param[:2] != (name, converter):
+                    raise ValueError(f"Conflicting parameter {segment} in route {pattern}")
+                node = node.param[2]
+            else:
+                node = node.static.setdefault(segment, _Node())
+        if method in node.targets:
+            raise ValueError(f"Duplicate route {method} {pattern}")
+        node.targets[method] = target
+
+    def match(self, method: str, path: str) -> Tuple[Optional[Any], Dict[str, Any], List[str]]:
+        """
+        Find the route for a request
+
+        Returns:
+            (target, path parameters, allowed methods). The target is None
+            if nothing matched; allowed methods is non-empty when the path
+            exists but not for this method.
+        """
+        found = _walk(self._root, _segments(path), 0, {})
+        if found is None:
+            return None, {}, []
+        node, params = found
+        if method not in node.targets:
+            return None, {}, sorted(node.targets)
+        return node.targets[method], params, []
+
+def _segments(path: str) -> List[str]:
+    """Split a path into its non-empty segments"""
+    return [segment for segment in path.split('/') if segment]
+
+def _walk(node: _Node, segments: List[str], position: int,
+          params: Dict[str, Any]) -> Optional[Tuple[_Node, Dict[str, Any]]]:
+    """Match segments from position onwards, preferring literal segments"""
+    if position == len(segments):
+        return (node, params) if node.targets else None
+
+    segment = segments[position]
+    child = node.static.get(segment)
+    if child is not None:
+        found = _walk(child, segments, position + 1, params)
+        if found is not None:
+            return found
+
+    if node.param is not None:
+        name, converter, child = node.param
+        try:
+            value = converter(segment)
+        except ValueError:
+            return None
+        return _walk(child, segments, position + 1, {**params, name: value})
+    return None
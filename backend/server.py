@@ -6,91 +6,140 @@
 # Last Modified: 2025-09-16 10:24:25
 # =====================================================================================
 
+import argparse
 import http.server
 import socketserver
+import socket
+import signal
+import threading
+import time
+import types
 import json
 import os
 import urllib.parse
 from http import HTTPStatus
 import mimetypes
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
 from pathlib import Path
 
 # Import our modules
-from api import APIHandler
+from api import APIHandler, BulkImport, route_name
 from utils import get_content_type, load_json_data, save_json_data
+from response_cache import DEFAULT_MAX_BYTES, configure_response_cache, get_response_cache
+from static_cache import DEFAULT_WATCH_INTERVAL, configure_static_cache, get_static_cache
+from http_common import (DEFAULT_COMPRESS_LEVEL, DEFAULT_COMPRESS_MIN_BYTES, configure_compression,
+                         encode_api_response, encode_error_response, encode_metrics_response,
+                         encode_options_response, body_framing_error, parse_chunk_size,
+                         parse_json_body, parse_query, BODY_CHUNK_BYTES, IMPORT_PATH,
+                         MAX_BODY_BYTES, MAX_CHUNK_LINE_BYTES, METRICS_PATH)
+from repository import DEFAULT_TOMBSTONE_RETENTION, STORAGE_MODES, configure_repository, get_repository
+from storage import FSYNC_POLICIES, DEFAULT_COMMIT_WINDOW
+from async_server import DEFAULT_MAX_CONNECTIONS, SHUTDOWN_GRACE, AsyncEduBridgeServer
+from logging_setup import (DEFAULT_ACCESS_SAMPLE, DEFAULT_LOG_BACKUPS, DEFAULT_LOG_MAX_BYTES,
+                           configure_logging, log_access, stop_logging)
+from metrics import record_request, request_finished, request_started
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('backend/logs/server.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logger
 logger = logging.getLogger(__name__)
 
+# Default size of the worker pool and of the queue of connections waiting for a worker
+DEFAULT_WORKER_THREADS = 16
+DEFAULT_QUEUE_SIZE = 64
+
+# Server engines selectable at startup
+ENGINES = ('threaded', 'asyncio')
+
 class EduBridgeHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     """Custom HTTP request handler for EduBridge"""
     
+    # Persistent connections: every response must carry a Content-Length
+    protocol_version = 'HTTP/1.1'
+    
+    # Seconds an idle keep-alive connection may hold on to a worker
+    timeout = 15
+    
     def __init__(self, *args, **kwargs):
         # Set the directory to serve files from
         super().__init__(*args, directory="frontend", **kwargs)
     
+    def handle_one_request(self):
+        """Handle one request, counting it as in flight from parse_request() until it is done"""
+        self._started = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self._started is not None:
+                request_finished()
+                self.server.set_busy(self.connection, False)
+            if self.server.closing:
+                self.close_connection = True
+    
+    def parse_request(self):
+        """Parse the request line and headers, starting the request's clock"""
+        self._started = time.perf_counter()
+        request_started()
+        self.server.set_busy(self.connection, True)
+        return super().parse_request()
+    
+    def log_request(self, code='-', size='-'):
+        """Requests are recorded by the access log in _send_encoded() instead"""
+    
+    def log_message(self, format, *args):
+        """Send http.server's own messages, such as malformed requests, to the server log"""
+        logger.warning("%s - %s", self.address_string(), format % args)
+    
     def do_GET(self):
         """Handle GET requests"""
-        logger.info(f"GET request for {self.path}")
-        
         # Parse the URL
         parsed_url = urllib.parse.urlparse(self.path)
         path = parsed_url.path
         
         # Handle API endpoints
         if path.startswith('/api/'):
-            api_handler = APIHandler()
-            response = api_handler.handle_get(path, {})
+            response = self.server.api_handler.handle_get(path, parse_query(parsed_url.query))
             self._send_api_response(response)
             return
         
-        # Handle static files
-        if path == '/' or path == '/index.html':
-            self.path = '/index.html'
-        elif path == '/courses':
-            self.path = '/courses.html'
-        elif path == '/about':
-            self.path = '/about.html'
+        if path == METRICS_PATH:
+            self._send_encoded(*encode_metrics_response(get_static_cache().stats(), self.headers))
+            return
         
-        # Serve static files using parent class method
-        return super().do_GET()
+        # Serve static files from the in-memory cache
+        self._send_encoded(*get_static_cache().respond(path, self.headers))
+    
+    def do_HEAD(self):
+        """Handle HEAD requests like GET requests, without sending the body"""
+        parsed_url = urllib.parse.urlparse(self.path)
+        path = parsed_url.path
+        if path.startswith('/api/'):
+            response = self.server.api_handler.handle_get(path, parse_query(parsed_url.query))
+            self._send_encoded(*encode_api_response(response, self.headers), send_body=False)
+            return
+        if path == METRICS_PATH:
+            self._send_encoded(*encode_metrics_response(get_static_cache().stats(), self.headers),
+                               send_body=False)
+            return
+        self._send_encoded(*get_static_cache().respond(path, self.headers), send_body=False)
     
     def do_POST(self):
         """Handle POST requests"""
-        logger.info(f"POST request for {self.path}")
-        
         # Parse the URL
         parsed_url = urllib.parse.urlparse(self.path)
         path = parsed_url.path
         
-        # Get content length
-        content_length = int(self.headers.get('Content-Length', 0))
-        
-        # Read the POST data
-        post_data = self.rfile.read(content_length)
+        # Bulk imports are processed while their body arrives
+        if path == IMPORT_PATH:
+            self._handle_import()
+            return
         
-        # Parse JSON data if content type is JSON
-        data = {}
-        if self.headers.get('Content-Type') == 'application/json':
-            try:
-                data = json.loads(post_data.decode('utf-8'))
-            except json.JSONDecodeError:
-                self._send_error_response(HTTPStatus.BAD_REQUEST, "Invalid JSON data")
-                return
+        data = self._read_json_body()
+        if data is None:
+            return
         
         # Handle API endpoints
         if path.startswith('/api/'):
-            api_handler = APIHandler()
-            response = api_handler.handle_post(path, data)
+            response = self.server.api_handler.handle_post(path, data)
             self._send_api_response(response)
             return
         
@@ -99,31 +148,17 @@ class EduBridgeHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     
     def do_PUT(self):
         """Handle PUT requests"""
-        logger.info(f"PUT request for {self.path}")
-        
         # Parse the URL
         parsed_url = urllib.parse.urlparse(self.path)
         path = parsed_url.path
         
-        # Get content length
-        content_length = int(self.headers.get('Content-Length', 0))
-        
-        # Read the PUT data
-        put_data = self.rfile.read(content_length)
-        
-        # Parse JSON data if content type is JSON
-        data = {}
-        if self.headers.get('Content-Type') == 'application/json':
-            try:
-                data = json.loads(put_data.decode('utf-8'))
-            except json.JSONDecodeError:
-                self._send_error_response(HTTPStatus.BAD_REQUEST, "Invalid JSON data")
-                return
+        data = self._read_json_body()
+        if data is None:
+            return
         
         # Handle API endpoints
         if path.startswith('/api/'):
-            api_handler = APIHandler()
-            response = api_handler.handle_put(path, data)
+            response = self.server.api_handler.handle_put(path, data)
             self._send_api_response(response)
             return
         
@@ -132,64 +167,309 @@ class EduBridgeHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     
     def do_DELETE(self):
         """Handle DELETE requests"""
-        logger.info(f"DELETE request for {self.path}")
-        
         # Parse the URL
         parsed_url = urllib.parse.urlparse(self.path)
         path = parsed_url.path
         
         # Handle API endpoints
         if path.startswith('/api/'):
-            api_handler = APIHandler()
-            response = api_handler.handle_delete(path)
+            response = self.server.api_handler.handle_delete(path)
             self._send_api_response(response)
             return
         
         # If we get here, it's an unknown endpoint
         self._send_error_response(HTTPStatus.NOT_FOUND, "Endpoint not found")
     
-    def _send_api_response(self, response):
-        """Send API response to client"""
-        # Set CORS headers
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+    def _read_json_body(self):
+        """
+        Read the request body, sending an error and returning None if it cannot be used
+        
+        Bodies sent with Content-Length and chunked bodies are both read to
+        their end. A body that cannot be read that far leaves the rest of it
+        on the connection, so the connection is closed.
+        """
+        error = body_framing_error(self.headers, MAX_BODY_BYTES)
+        body = bytearray()
+        if error is None:
+            try:
+                for chunk in self._body_chunks():
+                    body += chunk
+                    if len(body) > MAX_BODY_BYTES:
+                        error = (HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+                        break
+            except ValueError as e:
+                error = (HTTPStatus.BAD_REQUEST, str(e))
+            except TimeoutError:
+                error = (HTTPStatus.REQUEST_TIMEOUT, "Request timed out")
+        if error is not None:
+            self.close_connection = True
+            self._send_error_response(*error)
+            return None
+        
+        try:
+            return parse_json_body(bytes(body), self.headers.get('Content-Type'))
+        except ValueError as e:
+            self._send_error_response(HTTPStatus.BAD_REQUEST, str(e))
+            return None
+    
+    def _handle_import(self):
+        """Stream an NDJSON import body into a BulkImport"""
+        error = body_framing_error(self.headers)
+        if error is not None:
+            self.close_connection = True
+            self._send_error_response(*error)
+            return
+        
+        bulk_import = BulkImport(self.server.api_handler)
+        try:
+            for chunk in self._body_chunks():
+                bulk_import.feed(chunk)
+        except (ValueError, OSError) as e:
+            # The rest of the body cannot be found, so the connection cannot be reused
+            self.close_connection = True
+            summary = bulk_import.finish(complete=False)['data']
+            status, reason = HTTPStatus.BAD_REQUEST, str(e)
+            if isinstance(e, TimeoutError):
+                status, reason = HTTPStatus.REQUEST_TIMEOUT, "Request timed out"
+            self._send_error_response(
+                status,
+                f"{reason}; {summary['accepted']} records from the first {summary['lines']} lines were imported"
+            )
+            return
+        self._send_api_response(bulk_import.finish())
+    
+    def _body_chunks(self):
+        """
+        Yield the request body in pieces as it arrives
+        
+        Both Content-Length and chunked transfer encoding are supported.
+        
+        Raises:
+            ValueError: If the body is malformed or ends early
+        """
+        transfer_encoding = self.headers.get('Transfer-Encoding', '').lower()
+        if transfer_encoding and transfer_encoding != 'chunked':
+            raise ValueError(f"Unsupported transfer encoding ({transfer_encoding})")
         
-        # Send response
-        self.send_response(response['status'])
-        self.send_header('Content-Type', 'application/json')
-        self.end_headers()
+        if not transfer_encoding:
+            yield from self._read_exactly(int(self.headers.get('Content-Length', 0)))
+            return
         
-        # Send response data
-        if 'data' in response:
-            self.wfile.write(json.dumps(response['data']).encode('utf-8'))
+        while True:
+            size = parse_chunk_size(self.rfile.readline(MAX_CHUNK_LINE_BYTES))
+            if size == 0:
+                # Skip any trailer fields up to the blank line ending the body
+                while self.rfile.readline(MAX_CHUNK_LINE_BYTES).strip():
+                    pass
+                return
+            yield from self._read_exactly(size)
+            self.rfile.readline(MAX_CHUNK_LINE_BYTES)
+    
+    def _read_exactly(self, length):
+        """Yield length bytes of the body in pieces of at most BODY_CHUNK_BYTES"""
+        while length > 0:
+            data = self.rfile.read(min(length, BODY_CHUNK_BYTES))
+            if not data:
+                raise ValueError("Incomplete request body")
+            length -= len(data)
+            yield data
+    
+    def _send_api_response(self, response):
+        """Send API response to client"""
+        self._send_encoded(*encode_api_response(response, self.headers))
     
     def _send_error_response(self, status_code, message):
         """Send error response to client"""
-        self.send_response(status_code)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
-        error_response = {
-            'error': message,
-            'status': status_code
-        }
-        self.wfile.write(json.dumps(error_response).encode('utf-8'))
+        self._send_encoded(*encode_error_response(status_code, message))
     
     def do_OPTIONS(self):
         """Handle OPTIONS requests for CORS"""
-        self.send_response(HTTPStatus.OK)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Authorization')
-        self.end_headers()
+        self._send_encoded(*encode_options_response())
+    
+    def _send_encoded(self, status, headers, body, send_body=True):
+        """Write an encoded response, sending a file body with sendfile, and log and record it"""
+        sent = 0
+        try:
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            if self.close_connection:
+                self.send_header('Connection', 'close')
+            self.end_headers()
+            if not send_body:
+                return
+            if isinstance(body, bytes):
+                if body:
+                    self.wfile.write(body)
+                sent = len(body)
+            elif isinstance(body, types.GeneratorType):
+                sent = self._send_stream(body)
+            else:
+                sent = self.connection.sendfile(body)
+        finally:
+            if not isinstance(body, bytes):
+                body.close()
+            path = urllib.parse.urlparse(self.path).path
+            route = route_name(self.command, path)
+            duration = time.perf_counter() - self._started
+            log_access(self.command, route, path, status, sent, duration)
+            record_request(self.command, route, status, sent, duration)
+    
+    def _send_stream(self, chunks):
+        """Write a chunked body as it is produced, returning the bytes sent"""
+        sent = 0
+        try:
+            for chunk in chunks:
+                self.wfile.write(chunk)
+                sent += len(chunk)
+        except ConnectionError:
+            self.close_connection = True
+        except Exception as e:
+            # The status is already sent: leave the body unterminated so the client sees it is cut short
+            logger.error(f"Error streaming response for {self.path}: {e}", exc_info=True)
+            self.close_connection = True
+        return sent
+
+class PooledHTTPServer(socketserver.TCPServer):
+    """
+    TCP server handing each connection to a bounded pool of worker threads
+    
+    At most ``workers`` connections are served at once and at most
+    ``queue_size`` more wait for a worker. Connections beyond that are
+    answered with 503 straight away instead of piling up.
+    """
+    
+    allow_reuse_address = True
+    request_queue_size = 128
+    
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKER_THREADS,
+                 queue_size=DEFAULT_QUEUE_SIZE, bind_and_activate=True):
+        super().__init__(server_address, handler_class, bind_and_activate)
+        # Stateless, shared by every request handler
+        self.api_handler = APIHandler()
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http-worker')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        # Set once the server stops; workers then close connections after their request
+        self.closing = False
+        # Connections queued or being served by their future, and those inside a request
+        self._connections = {}
+        self._busy = set()
+        self._connections_lock = threading.Lock()
+    
+    def process_request(self, request, client_address):
+        """Queue the connection for a worker, or turn it away if the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            logger.warning(f"Request queue full, rejecting connection from {client_address[0]}")
+            self._reject(request)
+            self.shutdown_request(request)
+            return
+        future = self._pool.submit(self._process_request_worker, request, client_address)
+        with self._connections_lock:
+            self._connections[future] = request
+        future.add_done_callback(self._forget)
+    
+    def _forget(self, future):
+        """Stop tracking a connection whose worker finished"""
+        with self._connections_lock:
+            request = self._connections.pop(future, None)
+            self._busy.discard(request)
+    
+    def set_busy(self, request, busy):
+        """Mark a connection as inside a request or waiting for the next one"""
+        with self._connections_lock:
+            if busy:
+                self._busy.add(request)
+            else:
+                self._busy.discard(request)
+    
+    def _process_request_worker(self, request, client_address):
+        """Serve one connection on a worker thread"""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+    
+    def _reject(self, request):
+        """Answer a connection with 503 without reading the request"""
+        try:
+            request.sendall(
+                b"HTTP/1.1 503 Service Unavailable\r\n"
+                b"Content-Length: 0\r\n"
+                b"Retry-After: 1\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+        except OSError:
+            pass
+    
+    def server_close(self):
+        """
+        Stop accepting connections and let workers finish their current request
+        
+        Idle keep-alive connections are dropped at once and queued ones are
+        closed unserved. Requests in progress get SHUTDOWN_GRACE seconds to
+        finish, so the data layer is not closed under them.
+        """
+        self.closing = True
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._connections_lock:
+            connections = dict(self._connections)
+            idle = [request for future, request in connections.items()
+                    if future.running() and request not in self._busy]
+        for future, request in connections.items():
+            if future.cancelled():
+                self.shutdown_request(request)
+                self._slots.release()
+        for request in idle:
+            self._drop(request)
+        
+        _, running = wait_futures(connections, timeout=SHUTDOWN_GRACE)
+        if running:
+            logger.warning(f"Dropping {len(running)} connections still busy after {SHUTDOWN_GRACE}s")
+            for future in running:
+                self._drop(connections[future])
+    
+    def _drop(self, request):
+        """Wake a worker blocked on a connection by shutting the connection down"""
+        try:
+            request.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+def _raise_keyboard_interrupt(signum, frame):
+    """Signal handler turning SIGTERM into the same clean shutdown as Ctrl+C"""
+    raise KeyboardInterrupt
 
 class EduBridgeServer:
     """Main server class for EduBridge"""
     
-    def __init__(self, port=8000):
+    # A worker dying sooner than this after starting is restarted with a delay
+    WORKER_RESTART_DELAY = 1.0
+    
+    def __init__(self, port=8000, storage='snapshot', fsync='batched', commit_window=DEFAULT_COMMIT_WINDOW,
+                 threads=DEFAULT_WORKER_THREADS, queue_size=DEFAULT_QUEUE_SIZE, workers=1,
+                 engine='threaded', max_connections=DEFAULT_MAX_CONNECTIONS,
+                 static_watch_interval=DEFAULT_WATCH_INTERVAL, response_cache_bytes=DEFAULT_MAX_BYTES,
+                 compress_min_bytes=DEFAULT_COMPRESS_MIN_BYTES, compress_level=DEFAULT_COMPRESS_LEVEL,
+                 tombstone_retention=DEFAULT_TOMBSTONE_RETENTION):
         self.port = port
+        self.storage = storage
+        self.fsync = fsync
+        self.commit_window = commit_window
+        self.threads = threads
+        self.queue_size = queue_size
+        self.workers = workers
+        self.engine = engine
+        self.max_connections = max_connections
+        self.static_watch_interval = static_watch_interval
+        self.response_cache_bytes = response_cache_bytes
+        self.compress_min_bytes = compress_min_bytes
+        self.compress_level = compress_level
+        self.tombstone_retention = tombstone_retention
         self.server = None
         
         # Create necessary directories
@@ -214,13 +494,45 @@ class EduBridgeServer:
                     json.dump(default_content, f, indent=2)
                 logger.info(f"Created {file_path} with default content")
     
+    def _configure_data_layer(self):
+        """Set up the shared data layer with the selected storage mode"""
+        # Called in every serving process: writer threads and database
+        # connections do not survive fork()
+        configure_repository('backend/data', self.storage, self.fsync, self.commit_window,
+                             shared=self.workers > 1, tombstone_retention=self.tombstone_retention)
+        logger.info(f"Using '{self.storage}' storage for collections (fsync: {self.fsync})")
+    
     def start(self):
         """Start the server"""
+        if self.workers > 1:
+            self._start_workers()
+        else:
+            signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+            self._serve()
+    
+    def _serve(self, listening_socket=None):
+        """Serve requests in this process until stopped"""
         try:
-            # Create socket server
-            with socketserver.TCPServer(("", self.port), EduBridgeHTTPRequestHandler) as self.server:
-                logger.info(f"EduBridge server started on port {self.port}")
-                logger.info(f"Visit http://localhost:{self.port} to access the application")
+            self._configure_data_layer()
+            configure_static_cache('frontend', self.static_watch_interval)
+            configure_response_cache(self.response_cache_bytes)
+            configure_compression(self.compress_min_bytes, self.compress_level)
+            
+            if self.engine == 'asyncio':
+                AsyncEduBridgeServer(self.port, self.threads, self.max_connections,
+                                     listening_socket=listening_socket).serve_forever()
+                return
+            
+            # Create socket server, reusing the listening socket of a pre-forked parent
+            with PooledHTTPServer(("", self.port), EduBridgeHTTPRequestHandler,
+                                  self.threads, self.queue_size,
+                                  bind_and_activate=listening_socket is None) as self.server:
+                if listening_socket is not None:
+                    self.server.socket.close()
+                    self.server.socket = listening_socket
+                else:
+                    logger.info(f"Visit http://localhost:{self.port} to access the application")
+                logger.info(f"EduBridge server started on port {self.port} with {self.threads} worker threads")
                 
                 # Start serving requests
                 self.server.serve_forever()
@@ -232,8 +544,145 @@ class EduBridgeServer:
             if self.server:
                 self.server.server_close()
                 logger.info("Server closed")
+            logger.info(f"Data cache stats: {get_repository().stats()}")
+            logger.info(f"Static cache stats: {get_static_cache().stats()}")
+            logger.info(f"Response cache stats: {get_response_cache().stats()}")
+            get_static_cache().close()
+            get_repository().close()
+    
+    def _start_workers(self):
+        """Pre-fork worker processes sharing one listening socket and supervise them"""
+        # Bound once here and inherited by every worker. Workers race to
+        # accept connections, so a non-blocking socket keeps the losers
+        # from blocking in accept().
+        listening_socket = socket.create_server(("", self.port), backlog=PooledHTTPServer.request_queue_size)
+        listening_socket.setblocking(False)
+        logger.info(f"EduBridge server started on port {self.port} with {self.workers} worker processes")
+        logger.info(f"Visit http://localhost:{self.port} to access the application")
+        
+        children = {}
+        started = {}
+        stopping = False
+        
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+            for pid in list(children):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+        
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        
+        for index in range(self.workers):
+            started[index] = time.monotonic()
+            children[self._spawn_worker(listening_socket)] = index
+        
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index = children.pop(pid, None)
+            if index is None or stopping:
+                continue
+            
+            logger.warning(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+            if time.monotonic() - started[index] < self.WORKER_RESTART_DELAY:
+                # Don't spin if a worker keeps dying at startup
+                time.sleep(self.WORKER_RESTART_DELAY)
+            if not stopping:
+                started[index] = time.monotonic()
+                children[self._spawn_worker(listening_socket)] = index
+        
+        listening_socket.close()
+        logger.info("All workers stopped")
+    
+    def _spawn_worker(self, listening_socket):
+        """Fork one worker process serving from the shared listening socket"""
+        pid = os.fork()
+        if pid:
+            return pid
+        
+        # Worker: the parent handles Ctrl+C and forwards SIGTERM
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+            self._serve(listening_socket)
+        except BaseException:
+            exit_code = 1
+        finally:
+            stop_logging()
+            os._exit(exit_code)
 
 if __name__ == "__main__":
+    # Parse command line options
+    parser = argparse.ArgumentParser(description="EduBridge server")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on")
+    parser.add_argument('--storage', choices=STORAGE_MODES, default='snapshot',
+                        help="How collections are persisted: rewrite whole JSON files, append to a journal, "
+                             "or store them in SQLite (import existing data with migrate.py first)")
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default='batched',
+                        help="Fsync every commit, once per batch of commits, or leave flushing to the OS")
+    parser.add_argument('--commit-window-ms', type=float, default=DEFAULT_COMMIT_WINDOW * 1000,
+                        help="How long a writer gathers mutations into one commit")
+    parser.add_argument('--threads', type=int, default=DEFAULT_WORKER_THREADS,
+                        help="Number of worker threads serving connections")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Connections allowed to wait for a worker before new ones get 503")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of pre-forked server processes (0 for one per CPU core)")
+    parser.add_argument('--engine', choices=ENGINES, default='threaded',
+                        help="Serve connections from a thread pool, or from one asyncio event loop "
+                             "with --threads threads for blocking work")
+    parser.add_argument('--static-watch-interval', type=float, default=DEFAULT_WATCH_INTERVAL,
+                        help="Seconds between checks of frontend/ for changed files (0 to disable)")
+    parser.add_argument('--response-cache-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help="Memory for encoded API responses, least recently used evicted first (0 to disable)")
+    parser.add_argument('--compress-min-bytes', type=int, default=DEFAULT_COMPRESS_MIN_BYTES,
+                        help="Smallest API response compressed for clients accepting gzip or deflate")
+    parser.add_argument('--compress-level', type=int, choices=range(10), default=DEFAULT_COMPRESS_LEVEL,
+                        metavar='0-9', help="Compression level for API responses (0 disables compression)")
+    parser.add_argument('--max-connections', type=int, default=DEFAULT_MAX_CONNECTIONS,
+                        help="Open connections the asyncio engine accepts before new ones get 503")
+    parser.add_argument('--log-max-mb', type=float, default=DEFAULT_LOG_MAX_BYTES / (1024 * 1024),
+                        help="Size at which server.log and access.log are rotated")
+    parser.add_argument('--log-backups', type=int, default=DEFAULT_LOG_BACKUPS,
+                        help="Number of rotated files kept per log")
+    parser.add_argument('--access-log-sample', type=float, default=DEFAULT_ACCESS_SAMPLE,
+                        help="Fraction of requests written to access.log; server errors are always written")
+    parser.add_argument('--tombstone-retention', type=int, default=DEFAULT_TOMBSTONE_RETENTION,
+                        help="Changes a delete is kept for /api/sync; clients further behind must resync fully")
+    args = parser.parse_args()
+    if args.threads < 1:
+        parser.error("--threads must be at least 1")
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+    if args.workers > 1 and not hasattr(os, 'fork'):
+        parser.error("--workers needs os.fork(), which this platform does not provide")
+    if not 0 <= args.access_log_sample <= 1:
+        parser.error("--access-log-sample must be between 0 and 1")
+    if args.tombstone_retention < 1:
+        parser.error("--tombstone-retention must be at least 1")
+    
+    # Log through a queue; with workers, configured before they are forked
+    configure_logging(int(args.log_max_mb * 1024 * 1024), args.log_backups,
+                      args.access_log_sample, processes=args.workers)
+    
     # Create and start the server
-    server = EduBridgeServer()
-    server.start()
\ No newline at end of file
+    server = EduBridgeServer(port=args.port, storage=args.storage, fsync=args.fsync,
+                             commit_window=args.commit_window_ms / 1000,
+                             threads=args.threads, queue_size=args.queue_size,
+                             workers=args.workers, engine=args.engine,
+                             max_connections=args.max_connections,
+                             static_watch_interval=args.static_watch_interval,
+                             response_cache_bytes=int(args.response_cache_mb * 1024 * 1024),
+                             compress_min_bytes=args.compress_min_bytes, compress_level=args.compress_level,
+                             tombstone_retention=args.tombstone_retention)
+    try:
+        server.start()
+    finally:
+        stop_logging()
\ No newline at end of file
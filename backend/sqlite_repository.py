@@ -0,0 +1,511 @@
+# =====================================================================================
+# File: EduBridge/backend/sqlite_repository.py
+# Description: SQLite storage backend for EduBridge collections
+# Created: 2026-10-17 13:00:00
+# Last Modified: 2026-10-17 13:00:00
+# =====================================================================================
+
+import hashlib
+import json
+import os
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Import our modules
+from repository import (COLLECTION_NAMES, DEFAULT_TOMBSTONE_RETENTION, FOLDED_FIELDS, ORDERINGS, Repository,
+                        normalize_filter_value)
+from metrics import storage_timer
+from storage import JournalStorage
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Database file created inside the data directory
+DEFAULT_DB_NAME = 'edubridge.db'
+
+# Record fields copied into their own indexed columns; FOLDED_FIELDS are
+# stored casefolded so filters compare them like the JSON backend does
+INDEXED_COLUMNS = ('course_id', 'lecture_id', 'category', 'created_at', 'title')
+
+# Schema version kept in PRAGMA user_version; 1 stores FOLDED_FIELDS casefolded
+SCHEMA_VERSION = 1
+
+# SQLite synchronous level matching each fsync policy
+SYNCHRONOUS_LEVELS = {
+    'always': 'FULL',
+    'batched': 'NORMAL',
+    'os': 'OFF'
+}
+
+# Version counter and last change time of every collection, kept by triggers
+_VERSIONS_SCHEMA = """CREATE TABLE IF NOT EXISTS collection_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    modified REAL NOT NULL DEFAULT 0
+)"""
+
+# Random epoch chosen when the database is created. Version tags include it,
+# so counters that start over in a recreated database never repeat a tag
+_EPOCH_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS database_epoch (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        value TEXT NOT NULL
+    )""",
+    "INSERT OR IGNORE INTO database_epoch (id, value) VALUES (0, lower(hex(randomblob(4))))"
+]
+
+# Change sequence shared by all collections, and tombstones of deleted records
+_CHANGES_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS change_sequence (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        value INTEGER NOT NULL
+    )""",
+    "INSERT OR IGNORE INTO change_sequence (id, value) VALUES (0, 0)",
+    """CREATE TABLE IF NOT EXISTS tombstones (
+        collection TEXT NOT NULL,
+        id TEXT NOT NULL,
+        change_seq INTEGER NOT NULL,
+        PRIMARY KEY (collection, id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_tombstones_change ON tombstones (collection, change_seq, id)"
+]
+
+# Change number of a row; rows stored before changes were numbered count as 0
+_CHANGE_SEQ = "IFNULL(json_extract(data, '$.change_seq'), 0)"
+
+def _schema(table: str) -> List[str]:
+    """Return the statements creating a collection table, its indexes and version triggers"""
+    bump = (
+        f"BEGIN UPDATE collection_versions SET version = version + 1, "
+        f"modified = (julianday('now') - 2440587.5) * 86400.0 WHERE name = '{table}'; END"
+    )
+    return [
+        f"""CREATE TABLE IF NOT EXISTS {table} (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            course_id TEXT,
+            lecture_id TEXT,
+            category TEXT,
+            created_at TEXT,
+            title TEXT,
+            data TEXT NOT NULL
+        )""",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_course_id ON {table} (course_id)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_lecture_id ON {table} (lecture_id)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_course_lecture ON {table} (course_id, lecture_id)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_category ON {table} (category)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table} (created_at)"
+    ] + [
+        # Same keys as the in-memory orderings, missing values sort first
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_order_{name} ON {table} (IFNULL({column}, ''), id)"
+        for name, column in ORDERINGS.items()
+    ] + [
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_change ON {table} ({_CHANGE_SEQ}, id)",
+        f"INSERT OR IGNORE INTO collection_versions (name, modified) "
+        f"VALUES ('{table}', (julianday('now') - 2440587.5) * 86400.0)",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_insert AFTER INSERT ON {table} {bump}",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_update AFTER UPDATE ON {table} {bump}",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_delete AFTER DELETE ON {table} {bump}"
+    ]
+
+def _next_change(connection: sqlite3.Connection) -> int:
+    """Take the next change number inside the current write transaction"""
+    connection.execute("UPDATE change_sequence SET value = value + 1")
+    return connection.execute("SELECT value FROM change_sequence").fetchone()[0]
+
+def _row_values(record: Dict[str, Any]) -> tuple:
+    """Return (id, indexed columns..., data) for a record"""
+    return (
+        (record['id'],)
+        + tuple(normalize_filter_value(column, record.get(column)) for column in INDEXED_COLUMNS)
+        + (json.dumps(record, ensure_ascii=False),)
+    )
+
+class SQLiteCollection:
+    """One collection stored as a table in the shared SQLite database"""
+
+    def __init__(self, repository: 'SQLiteRepository', name: str):
+        """
+        Initialize collection
+
+        Args:
+            repository: Repository owning the database connections
+            name: Collection name, also used as the table name
+        """
+        self.repository = repository
+        self.name = name
+        self.reads = 0
+        self.writes = 0
+        self._stats_lock = threading.Lock()
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """Run a SELECT returning the data column and decode the records"""
+        with self._stats_lock:
+            self.reads += 1
+        rows = self.repository.connection().execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return all records in insertion order"""
+        return self._query(f"SELECT data FROM {self.name} ORDER BY seq")
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Return the record with the given ID, or None"""
+        records = self._query(f"SELECT data FROM {self.name} WHERE id = ?", (record_id,))
+        return records[0] if records else None
+
+    def version(self) -> Tuple[str, float]:
+        """Return a tag that changes whenever the collection changes, and the time it last changed"""
+        version, modified = self.repository.connection().execute(
+            "SELECT version, modified FROM collection_versions WHERE name = ?", (self.name,)
+        ).fetchone()
+        return f'{self.repository.epoch}.{version}', modified
+
+    def item_version(self, record_id: str) -> Optional[Tuple[str, float]]:
+        """Return the version tag and last change time of a record, or None if it does not exist"""
+        # Rows carry no change time of their own, the collection's is an upper bound
+        _, modified = self.version()
+        row = self.repository.connection().execute(
+            f"SELECT data FROM {self.name} WHERE id = ?", (record_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return hashlib.sha256(row[0].encode('utf-8')).hexdigest()[:16], modified
+
+    def find(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Return records whose indexed fields equal the given filter values"""
+        filters = {field: value for field, value in filters.items() if value}
+        unknown = [field for field in filters if field not in INDEXED_COLUMNS]
+        if unknown:
+            raise ValueError(f"Cannot filter {self.name} by {', '.join(unknown)}")
+        if not filters:
+            return self.all()
+
+        where = ' AND '.join(f"{field} = ?" for field in filters)
+        return self._query(
+            f"SELECT data FROM {self.name} WHERE {where} ORDER BY seq",
+            tuple(normalize_filter_value(field, value) for field, value in filters.items())
+        )
+
+    def page(self, ordering: str, after: Optional[Tuple[str, str]] = None, limit: int = 20,
+             filters: Optional[Dict[str, Any]] = None,
+             descending: bool = False) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        """Return the records following a position in one of the ORDERINGS (see Collection.page)"""
+        filters = {field: value for field, value in (filters or {}).items() if value}
+        unknown = [field for field in filters if field not in INDEXED_COLUMNS]
+        if unknown:
+            raise ValueError(f"Cannot filter {self.name} by {', '.join(unknown)}")
+
+        key = f"IFNULL({ORDERINGS[ordering]}, '')"
+        direction, comparison = ('DESC', '<') if descending else ('ASC', '>')
+        conditions = [f"{field} = ?" for field in filters]
+        params = [normalize_filter_value(field, value) for field, value in filters.items()]
+        if after is not None:
+            # (key, id) > (value, id) spelled out, so SQLite can seek the index to the bound
+            conditions.append(f"{key} {comparison}= ? AND ({key} {comparison} ? OR id {comparison} ?)")
+            params.extend((after[0], after[0], after[1]))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        with self._stats_lock:
+            self.reads += 1
+        # One row beyond the page tells whether another page follows
+        rows = self.repository.connection().execute(
+            f"SELECT {key}, id, data FROM {self.name} {where} "
+            f"ORDER BY {key} {direction}, id {direction} LIMIT ?",
+            tuple(params) + (limit + 1,)
+        ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return [json.loads(row[2]) for row in rows], ((rows[-1][0], rows[-1][1]) if more else None)
+
+    def changes(self, after: Tuple[int, str], until: int, limit: int) -> List[Dict[str, Any]]:
+        """Return records and tombstones in change order, from a position on (see Collection.changes)"""
+        # (change_seq, id) > after spelled out, so SQLite can seek the index to the bound
+        position = "{seq} >= ? AND ({seq} > ? OR id > ?) AND {seq} <= ?"
+        params = (after[0], after[0], after[1], until)
+        connection = self.repository.connection()
+        with self._stats_lock:
+            self.reads += 1
+        rows = connection.execute(
+            f"SELECT {_CHANGE_SEQ}, id, data FROM {self.name} WHERE {position.format(seq=_CHANGE_SEQ)} "
+            f"ORDER BY {_CHANGE_SEQ}, id LIMIT ?",
+            params + (limit,)
+        ).fetchall()
+        tombstones = connection.execute(
+            f"SELECT change_seq, id FROM tombstones WHERE collection = ? AND {position.format(seq='change_seq')} "
+            f"ORDER BY change_seq, id LIMIT ?",
+            (self.name,) + params + (limit,)
+        ).fetchall()
+        found = sorted(
+            [(row[0], row[1], json.loads(row[2])) for row in rows]
+            + [(row[0], row[1], {'id': row[1], 'deleted': True, 'change_seq': row[0]}) for row in tombstones]
+        )
+        return [record for _, _, record in found[:limit]]
+
+    def last_change(self) -> int:
+        """Return the number of the latest change to any collection"""
+        return self.repository.last_change()
+
+    def insert(self, record: Dict[str, Any]) -> bool:
+        """Insert a record"""
+        return self.apply([('insert', record)])[0]
+
+    def update(self, record_id: str, changes: Dict[str, Any]) -> bool:
+        """Apply changes to a record"""
+        return self.apply([('update', record_id, changes)])[0]
+
+    def delete(self, record_id: str) -> bool:
+        """Delete a record"""
+        return self.apply([('delete', record_id)])[0]
+
+    def apply(self, changes: List[Tuple[Any, ...]]) -> List[bool]:
+        """
+        Apply several inserts, updates and deletes in one transaction
+
+        Args:
+            changes: ('insert', record), ('update', record_id, changes) or
+                ('delete', record_id) tuples, applied in order
+
+        Returns:
+            Whether each change was applied; nothing is applied if the
+            transaction fails
+        """
+        functions = {'insert': self._insert_row, 'update': self._update_row, 'delete': self._delete_row}
+        unknown = [change[0] for change in changes if change[0] not in functions]
+        if unknown:
+            raise ValueError(f"Unknown change type: {', '.join(unknown)}")
+
+        connection = self.repository.connection()
+        try:
+            # Timed from waiting for the write lock to the commit
+            with storage_timer('write', self.name):
+                # One write lock for the whole batch, so read-modify-write
+                # updates don't interleave with other writers
+                connection.execute("BEGIN IMMEDIATE")
+                applied = [functions[kind](connection, *args) for kind, *args in changes]
+                if any(applied):
+                    connection.execute(
+                        "DELETE FROM tombstones WHERE collection = ? AND change_seq <= ?",
+                        (self.name, connection.execute("SELECT value FROM change_sequence").fetchone()[0]
+                         - self.repository.tombstone_retention)
+                    )
+                connection.execute("COMMIT")
+            with self._stats_lock:
+                self.writes += 1
+            return applied
+        except sqlite3.Error as e:
+            logger.error(f"Error writing to {self.name}: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return [False] * len(changes)
+
+    def _insert_row(self, connection: sqlite3.Connection, record: Dict[str, Any]) -> bool:
+        """Insert a record inside the current transaction"""
+        record['change_seq'] = _next_change(connection)
+        connection.execute("DELETE FROM tombstones WHERE collection = ? AND id = ?", (self.name, record['id']))
+        placeholders = ', '.join('?' * (len(INDEXED_COLUMNS) + 2))
+        cursor = connection.execute(
+            f"INSERT INTO {self.name} (id, {', '.join(INDEXED_COLUMNS)}, data) VALUES ({placeholders})",
+            _row_values(record)
+        )
+        return cursor.rowcount > 0
+
+    def _update_row(self, connection: sqlite3.Connection, record_id: str, changes: Dict[str, Any]) -> bool:
+        """Apply changes to a record inside the current transaction"""
+        row = connection.execute(f"SELECT data FROM {self.name} WHERE id = ?", (record_id,)).fetchone()
+        if row is None:
+            return False
+
+        updated = json.loads(row[0])
+        updated.update(changes)
+        updated['change_seq'] = _next_change(connection)
+        values = _row_values(updated)
+        assignments = ', '.join(f"{column} = ?" for column in INDEXED_COLUMNS + ('data',))
+        connection.execute(
+            f"UPDATE {self.name} SET {assignments} WHERE id = ?",
+            values[1:] + (record_id,)
+        )
+        return True
+
+    def _delete_row(self, connection: sqlite3.Connection, record_id: str) -> bool:
+        """Replace a record with its tombstone inside the current transaction"""
+        cursor = connection.execute(f"DELETE FROM {self.name} WHERE id = ?", (record_id,))
+        if cursor.rowcount == 0:
+            return False
+        connection.execute(
+            "INSERT OR REPLACE INTO tombstones (collection, id, change_seq) VALUES (?, ?, ?)",
+            (self.name, record_id, _next_change(connection))
+        )
+        return True
+
+    def count(self) -> int:
+        """Return the number of records"""
+        return self.repository.connection().execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+
+    def close(self) -> None:
+        """Nothing to flush, every write is committed immediately"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Return query statistics for this collection"""
+        return {
+            'reads': self.reads,
+            'writes': self.writes,
+            'records': self.count()
+        }
+
+class SQLiteRepository(Repository):
+    """Repository storing every collection in one SQLite database"""
+
+    def __init__(self, data_dir: str = 'backend/data', fsync: str = 'batched', db_name: str = DEFAULT_DB_NAME,
+                 tombstone_retention: int = DEFAULT_TOMBSTONE_RETENTION):
+        """
+        Initialize repository
+
+        Args:
+            data_dir: Directory holding the database file
+            fsync: Fsync policy, mapped onto SQLite's synchronous setting
+            db_name: Database file name inside data_dir
+            tombstone_retention: Changes a tombstone is kept for after its delete
+        """
+        if fsync not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.data_dir = data_dir
+        self.tombstone_retention = tombstone_retention
+        self.db_path = os.path.join(data_dir, db_name)
+        self.synchronous = SYNCHRONOUS_LEVELS[fsync]
+        # sqlite3 connections must not be shared between threads
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        os.makedirs(data_dir, exist_ok=True)
+        connection = self.connection()
+        connection.execute(_VERSIONS_SCHEMA)
+        for statement in _EPOCH_SCHEMA:
+            connection.execute(statement)
+        self.epoch = connection.execute("SELECT value FROM database_epoch").fetchone()[0]
+        for statement in _CHANGES_SCHEMA:
+            connection.execute(statement)
+        for name in COLLECTION_NAMES:
+            for statement in _schema(name):
+                connection.execute(statement)
+        self._upgrade(connection)
+        self._collections = {name: SQLiteCollection(self, name) for name in COLLECTION_NAMES}
+
+    def _upgrade(self, connection: sqlite3.Connection) -> None:
+        """Bring indexed columns written by older versions up to SCHEMA_VERSION"""
+        if connection.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        # IMMEDIATE so concurrently starting workers upgrade one at a time
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                for name in COLLECTION_NAMES:
+                    for field in FOLDED_FIELDS:
+                        rows = connection.execute(
+                            f"SELECT id, {field} FROM {name} WHERE {field} IS NOT NULL"
+                        ).fetchall()
+                        connection.executemany(
+                            f"UPDATE {name} SET {field} = ? WHERE id = ?",
+                            [(value.casefold(), row_id) for row_id, value in rows
+                             if isinstance(value, str) and value.casefold() != value]
+                        )
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                logger.info(f"Upgraded {self.db_path} to schema version {SCHEMA_VERSION}")
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+
+    def connection(self) -> sqlite3.Connection:
+        """Get this thread's database connection, opening it on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Autocommit mode: writes use explicit transactions or one statement each.
+            # Each connection is only used by the thread that opened it, the
+            # same-thread check is relaxed so close() can release all of them.
+            connection = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def collection(self, name: str) -> SQLiteCollection:
+        """Get a collection by name"""
+        return self._collections[name]
+
+    def last_change(self) -> int:
+        """Return the number of the latest change to any collection"""
+        # Numbers are taken inside write transactions, so every change up to
+        # the committed value is committed too
+        return self.connection().execute("SELECT value FROM change_sequence").fetchone()[0]
+
+    def sync_horizon(self) -> int:
+        """Return the oldest change number a sync can continue from"""
+        return max(0, self.last_change() - self.tombstone_retention)
+
+    def close(self) -> None:
+        """Close every thread's connection"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        # Threads reopen a connection if they keep using the repository
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return query statistics for every collection"""
+        return {name: c.stats() for name, c in self._collections.items()}
+
+def migrate_json_to_sqlite(data_dir: str = 'backend/data', db_name: str = DEFAULT_DB_NAME) -> Dict[str, int]:
+    """
+    Import the JSON collection files of a data directory into SQLite
+
+    Journals left by the 'journal' storage mode are replayed first. Records
+    already in the database are replaced and tombstones carried over, so the
+    import can be re-run.
+
+    Returns:
+        Number of records imported per collection
+    """
+    repository = SQLiteRepository(data_dir, db_name=db_name)
+    connection = repository.connection()
+    counts = {}
+    try:
+        for name in COLLECTION_NAMES:
+            records = JournalStorage(os.path.join(data_dir, f'{name}.json')).load()
+            records = [r for r in records if r.get('id')]
+            tombstones = [r for r in records if r.get('deleted') is True]
+            records = [r for r in records if r.get('deleted') is not True]
+            placeholders = ', '.join('?' * (len(INDEXED_COLUMNS) + 2))
+            # One transaction per collection
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO {name} (id, {', '.join(INDEXED_COLUMNS)}, data) VALUES ({placeholders})",
+                    [_row_values(record) for record in records]
+                )
+                connection.executemany(f"DELETE FROM {name} WHERE id = ?", [(r['id'],) for r in tombstones])
+                connection.executemany(
+                    "INSERT OR REPLACE INTO tombstones (collection, id, change_seq) VALUES (?, ?, ?)",
+                    [(name, r['id'], r.get('change_seq') or 0) for r in tombstones]
+                )
+                # Keep numbering after the highest imported change
+                connection.execute(
+                    "UPDATE change_sequence SET value = MAX(value, ?)",
+                    (max((r.get('change_seq') or 0 for r in records + tombstones), default=0),)
+                )
+                connection.execute("COMMIT")
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+            counts[name] = len(records)
+            logger.info(f"Imported {len(records)} {name} into {repository.db_path}")
+    finally:
+        repository.close()
+    return counts
@@ -0,0 +1,399 @@
+# =====================================================================================
+# File: EduBridge/backend/static_cache.py
+# Description: In-memory, precompressed cache of the frontend's static files
+# Created: 2026-10-17 16:00:00
+# Last Modified: 2026-10-17 16:00:00
+# =====================================================================================
+
+import copy
+import email.utils
+import gzip
+import hashlib
+import os
+import posixpath
+import re
+import threading
+import logging
+from http import HTTPStatus
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are built
+    brotli = None
+
+# Import our modules
+from utils import get_content_type
+from http_common import parse_accept_encoding, resolve_static_path
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Files up to this size are kept in memory, larger ones are sent with sendfile
+IN_MEMORY_MAX_BYTES = 256 * 1024
+
+# Files smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 512
+
+# Content types that compress well
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json',
+                      'application/xml', 'image/svg+xml', 'image/x-icon',
+                      'image/vnd.microsoft.icon')
+
+# Seconds between scans of the static directory for changed files
+DEFAULT_WATCH_INTERVAL = 2.0
+
+# Hex digits of the content hash put into fingerprinted file names
+FINGERPRINT_LENGTH = 10
+
+# Cache-Control for fingerprinted URLs, whose content can never change,
+# and for everything else, which browsers revalidate with the ETag
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# File name with a fingerprint: style.0123456789.css
+_FINGERPRINTED_NAME = re.compile(r'^(.+)\.([0-9a-f]{%d})(\.[^.]+)$' % FINGERPRINT_LENGTH)
+
+# href/src attributes in HTML pages
+_HTML_REFERENCE = re.compile(r'(\b(?:href|src)\s*=\s*)(["\'])([^"\']+)\2', re.IGNORECASE)
+
+# Content codings in order of preference
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# A static response: status, headers, and the body as bytes or as an open
+# file to be sent with sendfile (the caller closes it)
+StaticResponse = Tuple[int, List[Tuple[str, str]], Union[bytes, BinaryIO]]
+
+_NOT_FOUND_BODY = b"<html><body><h1>404 Not Found</h1></body></html>"
+
+class StaticAsset:
+    """One file of the static directory"""
+
+    __slots__ = ('file_path', 'url', 'content_type', 'size', 'mtime', 'stamp', 'source',
+                 'body', 'variants', 'digest', 'fingerprinted_url')
+
+    def __init__(self, file_path: str, url: str, stat: os.stat_result):
+        """
+        Index a file, loading and compressing it if it is small enough
+
+        Args:
+            file_path: Path of the file on disk
+            url: URL path the file is served under
+            stat: Result of os.stat() for the file
+        """
+        self.file_path = file_path
+        self.url = url
+        self.content_type = get_content_type(file_path)
+        self.size = stat.st_size
+        self.mtime = int(stat.st_mtime)
+        self.stamp = (stat.st_mtime_ns, stat.st_size)
+        self.source: Optional[bytes] = None
+        self.body: Optional[bytes] = None
+        self.variants: Dict[str, bytes] = {}
+        self.fingerprinted_url: Optional[str] = None
+
+        if self.size > IN_MEMORY_MAX_BYTES:
+            digest = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            self.digest = digest.hexdigest()
+            return
+        with open(file_path, 'rb') as f:
+            self.source = f.read()
+        self.set_body(self.source)
+
+    @property
+    def is_html(self) -> bool:
+        return self.content_type == 'text/html'
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest[:16]}"'
+
+    def set_body(self, body: bytes) -> None:
+        """Set the bytes served for this file, rebuilding its hash and variants"""
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.variants = {}
+        if len(body) >= COMPRESS_MIN_BYTES and self.content_type.startswith(COMPRESSIBLE_TYPES):
+            self._compress()
+
+    def _compress(self) -> None:
+        """Build the compressed variants that are actually smaller"""
+        # Compressed once at load time, so the highest levels are affordable
+        candidates = {'gzip': gzip.compress(self.body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            candidates['br'] = brotli.compress(self.body, quality=11)
+        self.variants = {
+            encoding: data for encoding, data in candidates.items()
+            if len(data) < len(self.body)
+        }
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Tuple[Optional[str], Optional[bytes]]:
+        """
+        Pick the representation to send for an Accept-Encoding header
+
+        Returns:
+            (content coding or None for identity, body or None if the file
+            must be read from disk)
+        """
+        if self.variants and accept_encoding:
+            accepted = parse_accept_encoding(accept_encoding)
+            for encoding in ENCODINGS:
+                if encoding in self.variants and accepted.get(encoding, accepted.get('*', 0)) > 0:
+                    return encoding, self.variants[encoding]
+        return None, self.body
+
+class StaticAssetCache:
+    """
+    Index of the static directory built at startup
+
+    Small files are served from memory together with precompressed gzip
+    (and brotli, if installed) variants, so a request costs no stat, open or
+    copy. Larger files are only indexed and sent with sendfile. A watcher
+    thread rescans the directory and reloads files that changed.
+
+    Every other asset is also reachable under a fingerprinted name such as
+    ``/css/style.<hash>.css``, which HTML pages are rewritten to reference.
+    Those URLs are cached by browsers for a year; pages and unfingerprinted
+    URLs are revalidated with their ETag.
+    """
+
+    def __init__(self, root: str = 'frontend', watch_interval: float = DEFAULT_WATCH_INTERVAL):
+        """
+        Initialize cache and index the directory
+
+        Args:
+            root: Directory static files are served from
+            watch_interval: Seconds between rescans, or 0 to never rescan
+        """
+        self.root = root
+        self.watch_interval = watch_interval
+        self.hits = 0
+        self.misses = 0
+        # Replaced as a whole on refresh, so readers never need a lock
+        self._assets: Dict[str, StaticAsset] = {}
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        self.refresh(force=True)
+        if watch_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, name='static-watcher', daemon=True)
+            self._watcher.start()
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Rescan the directory, reloading new and changed files
+
+        Whenever something changed, assets are fingerprinted again and the
+        references in HTML pages rewritten to the new fingerprinted URLs.
+
+        Returns:
+            Number of files added, changed or removed
+        """
+        assets = {}
+        changed = 0
+        for directory, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                file_path = os.path.join(directory, file_name)
+                try:
+                    stat = os.stat(file_path)
+                    current = self._assets.get(file_path)
+                    if current is not None and current.stamp == (stat.st_mtime_ns, stat.st_size):
+                        assets[file_path] = current
+                        continue
+                    url = '/' + os.path.relpath(file_path, self.root).replace(os.sep, '/')
+                    assets[file_path] = StaticAsset(file_path, url, stat)
+                    changed += 1
+                except OSError as e:
+                    logger.warning(f"Could not index static file {file_path}: {e}")
+        changed += len(self._assets.keys() - assets.keys())
+        if changed or force:
+            _fingerprint(assets)
+        self._assets = assets
+        return changed
+
+    def _watch(self) -> None:
+        """Watcher loop: rescan the directory until closed"""
+        while not self._stop.wait(self.watch_interval):
+            try:
+                changed = self.refresh()
+                if changed:
+                    logger.info(f"Reloaded {changed} changed static files from {self.root}")
+            except Exception as e:
+                logger.error(f"Error refreshing static files: {e}", exc_info=True)
+
+    def lookup(self, url_path: str) -> Optional[StaticAsset]:
+        """Return the asset a URL path refers to, or None"""
+        return self._resolve(url_path)[0]
+
+    def _resolve(self, url_path: str) -> Tuple[Optional[StaticAsset], bool]:
+        """
+        Find the asset for a URL path
+
+        Returns:
+            (asset or None, whether the URL carries the asset's current fingerprint)
+        """
+        file_path = resolve_static_path(self.root, url_path)
+        # Directories are only known by the files indexed below them
+        asset = self._assets.get(file_path) or self._assets.get(os.path.join(file_path, 'index.html'))
+        fingerprinted = False
+        if asset is None:
+            directory, file_name = os.path.split(file_path)
+            match = _FINGERPRINTED_NAME.match(file_name)
+            if match:
+                # Stale fingerprints still get the current file, just not cached for good
+                asset = self._assets.get(os.path.join(directory, match.group(1) + match.group(3)))
+                fingerprinted = asset is not None and asset.fingerprinted_url is not None \
+                    and asset.digest.startswith(match.group(2))
+
+        if asset is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return asset, fingerprinted
+
+    def respond(self, url_path: str, request_headers: Any) -> StaticResponse:
+        """
+        Build the response to a GET or HEAD for a static file
+
+        Args:
+            url_path: Path part of the request URL
+            request_headers: Request headers (anything with a .get() method)
+        """
+        asset, fingerprinted = self._resolve(url_path)
+        if asset is None:
+            return HTTPStatus.NOT_FOUND, [
+                ('Content-Type', 'text/html; charset=utf-8'),
+                ('Content-Length', str(len(_NOT_FOUND_BODY)))
+            ], _NOT_FOUND_BODY
+
+        encoding, body = asset.negotiate(request_headers.get('Accept-Encoding'))
+        etag = asset.etag if not encoding else f'"{asset.digest[:16]}-{encoding}"'
+        headers = [
+            ('Content-Type', asset.content_type),
+            ('Last-Modified', email.utils.formatdate(asset.mtime, usegmt=True)),
+            ('ETag', etag),
+            ('Cache-Control', IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL)
+        ]
+        if asset.variants:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if _not_modified(asset, request_headers):
+            return HTTPStatus.NOT_MODIFIED, headers, b''
+
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        if body is None:
+            # Large file: size the response from the file actually opened
+            f = open(asset.file_path, 'rb')
+            headers.append(('Content-Length', str(os.fstat(f.fileno()).st_size)))
+            return HTTPStatus.OK, headers, f
+        headers.append(('Content-Length', str(len(body))))
+        return HTTPStatus.OK, headers, body
+
+    def close(self) -> None:
+        """Stop the watcher thread"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache statistics"""
+        assets = list(self._assets.values())
+        return {
+            'files': len(assets),
+            'in_memory': sum(1 for asset in assets if asset.body is not None),
+            'memory_bytes': sum(
+                len(asset.body) + sum(len(v) for v in asset.variants.values())
+                for asset in assets if asset.body is not None
+            ),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+def _fingerprint(assets: Dict[str, StaticAsset]) -> None:
+    """Name every non-HTML asset by its content hash and rewrite HTML references to it"""
+    by_url = {}
+    for asset in assets.values():
+        if asset.is_html:
+            continue
+        base, extension = posixpath.splitext(asset.url)
+        asset.fingerprinted_url = f"{base}.{asset.digest[:FINGERPRINT_LENGTH]}{extension}"
+        by_url[asset.url] = asset
+
+    for file_path, asset in assets.items():
+        if asset.is_html and asset.source is not None:
+            page_directory = posixpath.dirname(asset.url)
+            text = asset.source.decode('utf-8', errors='surrogateescape')
+            referenced: List[StaticAsset] = []
+            rewritten = _HTML_REFERENCE.sub(
+                lambda m: _rewrite_reference(m, page_directory, by_url, referenced), text
+            )
+            # Pages may be in use by requests, rewrite a copy
+            page = copy.copy(asset)
+            page.set_body(rewritten.encode('utf-8', errors='surrogateescape'))
+            # The rewritten page changes whenever an asset it references
+            # does, so it was last modified when the newest of them was
+            page.mtime = max([asset.mtime] + [dependency.mtime for dependency in referenced])
+            assets[file_path] = page
+
+def _rewrite_reference(match: re.Match, page_directory: str, by_url: Dict[str, StaticAsset],
+                       referenced: List[StaticAsset]) -> str:
+    """Replace an href/src value with the fingerprinted URL of the asset it names, collecting the asset"""
+    reference = match.group(3)
+    if reference.startswith(('#', '//')) or ':' in reference:
+        return match.group(0)
+    path, separator, suffix = reference, '', ''
+    split = re.search(r'[?#]', reference)
+    if split:
+        path, separator, suffix = reference[:split.start()], split.group(), reference[split.end():]
+    url = path if path.startswith('/') else posixpath.join(page_directory, path)
+    asset = by_url.get(posixpath.normpath(url))
+    if asset is None:
+        return match.group(0)
+    referenced.append(asset)
+    return f"{match.group(1)}{match.group(2)}{asset.fingerprinted_url}{separator}{suffix}{match.group(2)}"
+
+def _not_modified(asset: StaticAsset, request_headers: Any) -> bool:
+    """Whether If-None-Match, or else If-Modified-Since, makes a 304 possible"""
+    none_match = request_headers.get('If-None-Match')
+    if none_match:
+        tags = [tag.strip() for tag in none_match.split(',')]
+        return any(
+            tag == '*' or tag.removeprefix('W/').strip('"').split('-')[0] == asset.digest[:16]
+            for tag in tags
+        )
+
+    since = request_headers.get('If-Modified-Since')
+    if not since:
+        return False
+    try:
+        since_time = email.utils.parsedate_to_datetime(since).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return False
+    return asset.mtime <= since_time
+
+# Shared cache, created per serving process
+_static_cache: Optional[StaticAssetCache] = None
+_static_cache_lock = threading.Lock()
+
+def configure_static_cache(root: str = 'frontend',
+                           watch_interval: float = DEFAULT_WATCH_INTERVAL) -> StaticAssetCache:
+    """Create the shared static cache, replacing any previous one"""
+    global _static_cache
+    cache = StaticAssetCache(root, watch_interval)
+    with _static_cache_lock:
+        if _static_cache is not None:
+            _static_cache.close()
+        _static_cache = cache
+    logger.info(f"Indexed static files from {root}: {cache.stats()}")
+    return cache
+
+def get_static_cache() -> StaticAssetCache:
+    """Get the shared static cache, creating it on first use"""
+    global _static_cache
+    with _static_cache_lock:
+        if _static_cache is None:
+            _static_cache = StaticAssetCache()
+        return _static_cache
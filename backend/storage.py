@@ -0,0 +1,324 @@
+# =====================================================================================
+# File: EduBridge/backend/storage.py
+# Description: On-disk storage strategies for EduBridge collections
+# Created: 2026-10-17 10:30:00
+# Last Modified: 2026-10-17 10:30:00
+# =====================================================================================
+
+import json
+import os
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no inter-process locking, single process only
+    fcntl = None
+
+# Import our modules
+from metrics import collection_of, storage_timer
+from utils import fsync_directory, load_json_data, save_json_data
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Journals smaller than this are never compacted
+COMPACT_MIN_BYTES = 1024 * 1024
+
+# When commits are flushed to disk with fsync:
+#   always  - every commit is fsynced and committed as soon as it is queued
+#   batched - mutations arriving within the commit window share one fsync
+#   os      - mutations are batched and flushing is left to the OS
+FSYNC_POLICIES = ('always', 'batched', 'os')
+
+# Default time the writer waits for more mutations before committing
+DEFAULT_COMMIT_WINDOW = 0.005
+
+def _stat_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) of a file, or None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class FileLock:
+    """
+    Exclusive lock shared between threads and processes
+
+    Uses flock() on a separate lock file so it survives the data file being
+    replaced by os.replace(). Where fcntl is unavailable only threads of the
+    current process are excluded.
+    """
+
+    def __init__(self, path: str):
+        """Initialize lock backed by the given lock file"""
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> 'FileLock':
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            try:
+                if self._fd is None:
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        try:
+            if fcntl is not None and self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+def put_mutation(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a mutation that inserts or replaces a whole record"""
+    return {'op': 'put', 'record': record}
+
+class SnapshotStorage:
+    """Stores a collection as one JSON file rewritten on every change"""
+
+    def __init__(self, file_path: str):
+        """Initialize storage for the given JSON file"""
+        self.file_path = file_path
+        # Serializes writers across processes
+        self.lock = FileLock(file_path + '.lock')
+
+    def stamp(self) -> Any:
+        """Return a value that changes whenever the stored data changes"""
+        return _stat_stamp(self.file_path)
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Load all records"""
+        return load_json_data(self.file_path)
+
+    def commit(self, mutations: List[Dict[str, Any]], records: Callable[[], List[Dict[str, Any]]],
+               fsync: bool = False) -> bool:
+        """Persist a batch of mutations by atomically rewriting the file from the current records"""
+        return save_json_data(self.file_path, records(), fsync=fsync)
+
+    def needs_compaction(self) -> bool:
+        """Snapshots never need compaction"""
+        return False
+
+class JournalStorage:
+    """
+    Stores a collection as a JSON snapshot plus an append-only journal
+
+    Every mutation is appended to ``<name>.journal`` as one compact JSON line,
+    so a write costs O(record). Loading replays the journal onto the snapshot.
+    Compaction folds the journal back into the snapshot: the journal is first
+    renamed to ``<name>.journal.compacting`` so new appends go to a fresh
+    file, then the snapshot is replaced and the renamed journal removed.
+    Replaying a journal twice gives the same result, so a crash at any point
+    of a compaction loses nothing.
+    """
+
+    def __init__(self, file_path: str):
+        """Initialize storage for the given JSON snapshot file"""
+        self.file_path = file_path
+        base, _ = os.path.splitext(file_path)
+        self.journal_path = base + '.journal'
+        self.compacting_path = self.journal_path + '.compacting'
+        # Serializes writers across processes
+        self.lock = FileLock(file_path + '.lock')
+        # Keeps appends and journal rotation from interleaving
+        self._journal_lock = threading.Lock()
+
+    def stamp(self) -> Any:
+        """Return a value that changes whenever the stored data changes"""
+        return (
+            _stat_stamp(self.file_path),
+            _stat_stamp(self.compacting_path),
+            _stat_stamp(self.journal_path)
+        )
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Load the snapshot and replay any journals onto it"""
+        records: Dict[Any, Dict[str, Any]] = {}
+        for position, record in enumerate(load_json_data(self.file_path)):
+            records[record.get('id', ('__row', position))] = record
+
+        for path in (self.compacting_path, self.journal_path):
+            self._replay(path, records)
+        return list(records.values())
+
+    def _replay(self, path: str, records: Dict[Any, Dict[str, Any]]) -> None:
+        """Apply every mutation in a journal file to records"""
+        if not os.path.exists(path):
+            return
+
+        with storage_timer('replay', collection_of(self.file_path)), open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    mutation = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line means the process died mid-append
+                    logger.warning(f"Skipping unreadable line {line_number} in {path}")
+                    continue
+
+                if mutation.get('op') == 'put':
+                    record = mutation['record']
+                    records[record['id']] = record
+                elif mutation.get('op') == 'delete':
+                    # Written by versions that deleted records instead of storing tombstones
+                    records.pop(mutation['id'], None)
+
+    def commit(self, mutations: List[Dict[str, Any]], records: Callable[[], List[Dict[str, Any]]],
+               fsync: bool = False) -> bool:
+        """Persist a batch of mutations with a single append to the journal"""
+        try:
+            lines = ''.join(
+                json.dumps(mutation, ensure_ascii=False, separators=(',', ':')) + '\n'
+                for mutation in mutations
+            )
+            with self._journal_lock, storage_timer('append', collection_of(self.file_path)):
+                created = not os.path.exists(self.journal_path)
+                with open(self.journal_path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                    if fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                if fsync and created:
+                    # The new journal's directory entry must be durable too
+                    fsync_directory(os.path.dirname(self.journal_path) or '.')
+            return True
+        except (TypeError, ValueError, OSError) as e:
+            logger.error(f"Error appending to journal {self.journal_path}: {e}")
+            return False
+
+    def needs_compaction(self) -> bool:
+        """Compact once the journal outgrows both the minimum and the snapshot"""
+        journal = _stat_stamp(self.journal_path)
+        if journal is None or journal[1] < COMPACT_MIN_BYTES:
+            return False
+        snapshot = _stat_stamp(self.file_path)
+        return snapshot is None or journal[1] > snapshot[1]
+
+    def begin_compaction(self) -> None:
+        """
+        Move the live journal aside so appends go to a fresh journal
+
+        Must be called while mutations are excluded, together with taking
+        the copy of the records that will become the new snapshot.
+        """
+        with self._journal_lock:
+            if not os.path.exists(self.journal_path):
+                return
+            if os.path.exists(self.compacting_path):
+                # A previous compaction did not finish, keep its entries
+                with open(self.journal_path, 'rb') as src, open(self.compacting_path, 'ab') as dst:
+                    dst.write(src.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.compacting_path)
+
+    def finish_compaction(self, records: List[Dict[str, Any]]) -> bool:
+        """Write records as the new snapshot and drop the folded journal"""
+        # The snapshot must be durable before the journal it replaces goes away
+        if not save_json_data(self.file_path, records, fsync=True):
+            return False
+        try:
+            if os.path.exists(self.compacting_path):
+                os.remove(self.compacting_path)
+            return True
+        except OSError as e:
+            logger.error(f"Error removing compacted journal {self.compacting_path}: {e}")
+            return False
+
+class GroupCommitWriter:
+    """
+    Single writer thread that commits queued mutations in batches
+
+    Mutations submitted within the commit window are handed to the commit
+    function together, so a burst of writes costs one file write (and at
+    most one fsync) instead of one per mutation. Each submitter gets a
+    Future that resolves to True once its batch is on disk.
+    """
+
+    def __init__(self, name: str, commit: Callable[[List[Dict[str, Any]], bool], bool],
+                 fsync: str = 'batched', window: float = DEFAULT_COMMIT_WINDOW):
+        """
+        Initialize writer
+
+        Args:
+            name: Name used for the writer thread
+            commit: Function persisting a batch of mutations, given the batch
+                and whether to fsync
+            fsync: One of FSYNC_POLICIES
+            window: Seconds to wait for more mutations before committing
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.name = name
+        self.fsync = fsync
+        self.window = 0 if fsync == 'always' else window
+        self._commit = commit
+        # Submitted mutation lists, each with the Future of its submitter
+        self._queue: List[Tuple[List[Dict[str, Any]], Future]] = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f'writer-{name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, mutation: Dict[str, Any]) -> Future:
+        """Queue a mutation for the next commit"""
+        return self.submit_many([mutation])
+
+    def submit_many(self, mutations: List[Dict[str, Any]]) -> Future:
+        """Queue several mutations that are committed together, with one Future for all of them"""
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError(f"Writer '{self.name}' is closed")
+            self._queue.append((mutations, future))
+            self._condition.notify()
+        return future
+
+    def close(self) -> None:
+        """Commit everything still queued and stop the writer thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self) -> None:
+        """Writer loop: wait for mutations, gather a batch, commit it"""
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+
+            # Let concurrent writers join this batch
+            if self.window and not self._closed:
+                time.sleep(self.window)
+
+            with self._condition:
+                batch, self._queue = self._queue, []
+
+            try:
+                ok = self._commit([mutation for mutations, _ in batch for mutation in mutations],
+                                  self.fsync != 'os')
+            except Exception as e:
+                logger.error(f"Error committing batch for '{self.name}': {e}", exc_info=True)
+                ok = False
+            for _, future in batch:
+                future.set_result(ok)
+
+# Storage strategies selectable at startup
+STORAGE_CLASSES = {
+    'snapshot': SnapshotStorage,
+    'journal': JournalStorage
+}
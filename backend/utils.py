@@ -5,15 +5,20 @@
 # Last Modified: 2025-09-16 10:27:09
 # =====================================================================================
 
+import base64
 import json
 import os
 import mimetypes
 import hashlib
 import secrets
+import tempfile
 import logging
 from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
 
+# Import our modules
+from metrics import timed_storage
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
@@ -22,37 +27,75 @@ def get_content_type(file_path: str) -> str:
     content_type, _ = mimetypes.guess_type(file_path)
     return content_type or 'application/octet-stream'
 
+class DataFileError(Exception):
+    """A data file exists but cannot be read or parsed"""
+
+@timed_storage('load')
 def load_json_data(file_path: str) -> Union[List[Any], Dict[str, Any]]:
-    """Load JSON data from file, return empty list/dict if file doesn't exist"""
-    try:
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            # Return appropriate empty structure based on file name
-            if file_path.endswith(('courses.json', 'lectures.json', 'notes.json', 'quizzes.json')):
-                return []
-            else:
-                return {}
-    except (json.JSONDecodeError, IOError) as e:
-        logger.error(f"Error loading JSON data from {file_path}: {e}")
+    """
+    Load JSON data from file, return empty list/dict if file doesn't exist
+    
+    Raises:
+        DataFileError: If the file exists but cannot be read or parsed. An
+            empty result would be written back over the data by the next save.
+    """
+    if not os.path.exists(file_path):
         # Return appropriate empty structure based on file name
         if file_path.endswith(('courses.json', 'lectures.json', 'notes.json', 'quizzes.json')):
             return []
         else:
             return {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, UnicodeDecodeError, IOError) as e:
+        logger.error(f"Error loading JSON data from {file_path}: {e}")
+        raise DataFileError(f"Cannot load {file_path}: {e}") from e
+
+def fsync_directory(directory: str) -> None:
+    """Flush a directory to disk so files created or renamed in it survive a crash"""
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
-def save_json_data(file_path: str, data: Union[List[Any], Dict[str, Any]]) -> bool:
-    """Save JSON data to file"""
+@timed_storage('save')
+def save_json_data(file_path: str, data: Union[List[Any], Dict[str, Any]], fsync: bool = False) -> bool:
+    """
+    Save JSON data to file atomically
+    
+    The data is written to a temporary file in the same directory which then
+    replaces the target, so readers never observe a partially written file.
+    With fsync the data is flushed to disk before the rename, and the
+    directory after it so the rename itself is durable.
+    """
+    tmp_path = None
     try:
         # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        directory = os.path.dirname(file_path) or '.'
+        os.makedirs(directory, exist_ok=True)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
+        fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(file_path) + '.', suffix='.tmp', dir=directory)
+        # mkstemp creates owner-only files, keep the target's permissions instead
+        mode = os.stat(file_path).st_mode & 0o777 if os.path.exists(file_path) else 0o644
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+        tmp_path = None
+        if fsync:
+            fsync_directory(directory)
         return True
-    except (TypeError, IOError) as e:
+    except (TypeError, ValueError, OSError) as e:
         logger.error(f"Error saving JSON data to {file_path}: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
         return False
 
 def generate_id() -> str:
@@ -124,7 +167,8 @@ def filter_by_category(items: List[Dict[str, Any]], category: str) -> List[Dict[
     """Filter items by category"""
     if category == 'all' or not category:
         return items
-    return [item for item in items if item.get('category', '').lower() == category.lower()]
+    category = category.casefold()
+    return [item for item in items if (item.get('category') or '').casefold() == category]
 
 def sort_items(items: List[Dict[str, Any]], sort_by: str) -> List[Dict[str, Any]]:
     """Sort items based on sort_by parameter"""
@@ -162,6 +206,22 @@ def paginate_items(items: List[Any], page: int = 1, per_page: int = 10) -> Dict[
         'total_pages': total_pages
     }
 
+def encode_cursor(position: List[Any]) -> str:
+    """Encode a pagination position as an opaque URL-safe cursor"""
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a cursor made by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(position, list):
+        raise ValueError("Malformed cursor")
+    return position
+
 def create_search_index_item(content_type: str, content_id: str, title: str, 
                            description: str, category: str, tags: List[str]) -> Dict[str, Any]:
     """Create a search index item"""